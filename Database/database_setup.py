@@ -5,7 +5,102 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# SQL commands to create tables
+TABLE_COMMANDS = (
+    """
+    CREATE TABLE IF NOT EXISTS banks (
+        bank_id SERIAL PRIMARY KEY,
+        bank_name VARCHAR(100) NOT NULL,
+        app_name VARCHAR(100),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # Reviews are range-partitioned by month of review_date; partitions
+    # are created by the loader as new months arrive (see partitions.py).
+    # Partition keys (review_date, and bank_id for optional per-bank
+    # sub-partitions) have to be part of the primary key.
+    """
+    CREATE TABLE IF NOT EXISTS reviews (
+        review_id SERIAL,
+        bank_id INTEGER NOT NULL REFERENCES banks(bank_id),
+        review_text TEXT,
+        rating INTEGER,
+        review_date DATE NOT NULL,
+        sentiment_label VARCHAR(20),
+        sentiment_score FLOAT,
+        source VARCHAR(100),
+        language VARCHAR(10),
+        themes TEXT[],
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (review_id, review_date, bank_id)
+    ) PARTITION BY RANGE (review_date)
+    """,
+    # Indexes backing the insights aggregations (per-bank trends and
+    # sentiment-filtered theme counts)
+    """
+    CREATE INDEX IF NOT EXISTS idx_reviews_bank_date
+        ON reviews (bank_id, review_date)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_reviews_bank_sentiment
+        ON reviews (bank_id, sentiment_label)
+    """,
+    # Full-text search (scripts/review_search.py). The column is generated,
+    # so every insert keeps it current; Ethiopic punctuation becomes spaces
+    # so Amharic words are indexed separately.
+    """
+    ALTER TABLE reviews ADD COLUMN IF NOT EXISTS search_tsv tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector('english', translate(coalesce(review_text, ''), '፡።፣፤፥፦፧፨', '        '))
+        ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_reviews_search
+        ON reviews USING GIN (search_tsv)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_reviews_themes
+        ON reviews USING GIN (themes)
+    """,
+    # Daily rollups maintained by the loader (see rollup.py); trend
+    # queries read these instead of scanning reviews
+    """
+    CREATE TABLE IF NOT EXISTS review_daily_rollup (
+        bank_id INTEGER REFERENCES banks(bank_id),
+        day DATE NOT NULL,
+        language VARCHAR(10) NOT NULL,
+        sentiment_label VARCHAR(20) NOT NULL,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        score_count INTEGER NOT NULL DEFAULT 0,
+        score_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+        rating_count INTEGER NOT NULL DEFAULT 0,
+        rating_sum BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (bank_id, day, language, sentiment_label)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS review_daily_theme_rollup (
+        bank_id INTEGER REFERENCES banks(bank_id),
+        day DATE NOT NULL,
+        language VARCHAR(10) NOT NULL,
+        sentiment_label VARCHAR(20) NOT NULL,
+        theme VARCHAR(100) NOT NULL,
+        theme_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bank_id, day, language, sentiment_label, theme)
+    )
+    """,
+    # Ids of batches loaded by the streaming writer (load_data.py), recorded
+    # in the same transaction as their reviews so a replayed batch is skipped
+    """
+    CREATE TABLE IF NOT EXISTS loaded_batches (
+        batch_id VARCHAR(200) PRIMARY KEY,
+        loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+)
+
 def create_database():
+    db_name = os.getenv("DB_NAME", "bank_reviews")
     # Connect to the default 'postgres' database to create other databases
     conn = psycopg2.connect(
         dbname="postgres",
@@ -18,14 +113,14 @@ def create_database():
     cursor = conn.cursor()
     
     try:
-        cursor.execute("SELECT 1 FROM pg_database WHERE datname = 'bank_reviews'")
+        cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (db_name,))
         exists = cursor.fetchone()
         
         if not exists:
-            cursor.execute("CREATE DATABASE bank_reviews")
-            print("Database 'bank_reviews' created successfully")
+            cursor.execute(f'CREATE DATABASE "{db_name}"')
+            print(f"Database '{db_name}' created successfully")
         else:
-            print("Database 'bank_reviews' already exists")
+            print(f"Database '{db_name}' already exists")
             
     except Exception as e:
         print(f"Error creating database: {e}")
@@ -34,9 +129,10 @@ def create_database():
         conn.close()
 
 def create_tables():
+    db_name = os.getenv("DB_NAME", "bank_reviews")
     # Connect specifically to bank_reviews DB
     conn = psycopg2.connect(
-        dbname="bank_reviews",
+        dbname=db_name,
         user=os.getenv("DB_USER", "postgres"),   # FIXED
         host=os.getenv("DB_HOST", "localhost"),
         port=os.getenv("DB_PORT", "5432")
@@ -44,35 +140,8 @@ def create_tables():
     )
     cursor = conn.cursor()
     
-    # SQL commands to create tables
-    commands = (
-        """
-        CREATE TABLE IF NOT EXISTS banks (
-            bank_id SERIAL PRIMARY KEY,
-            bank_name VARCHAR(100) NOT NULL,
-            app_name VARCHAR(100),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """,
-        """
-        CREATE TABLE IF NOT EXISTS reviews (
-            review_id SERIAL PRIMARY KEY,
-            bank_id INTEGER REFERENCES banks(bank_id),
-            review_text TEXT,
-            rating INTEGER,
-            review_date DATE,
-            sentiment_label VARCHAR(20),
-            sentiment_score FLOAT,
-            source VARCHAR(100),
-            language VARCHAR(10),
-            themes TEXT[],
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-    )
-    
     try:
-        for command in commands:
+        for command in TABLE_COMMANDS:
             cursor.execute(command)
         conn.commit()
         print("Tables created successfully")
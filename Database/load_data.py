@@ -1,9 +1,22 @@
 import os
+import sys
+import queue
+import threading
+from pathlib import Path
 import pandas as pd
 import psycopg2
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 from datetime import datetime
 
+from partitions import ensure_partitions
+from rollup import update_daily_rollup
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scripts.analyzed_data import parse_themes
+
 # Load environment variables
 load_dotenv()
 
@@ -36,35 +49,215 @@ def insert_bank_data(conn, bank_name, app_name=None):
         conn.commit()
         return bank_id
 
+REVIEW_COLUMNS = (
+    "bank_id", "review_text", "rating", "review_date",
+    "sentiment_label", "sentiment_score", "source", "language", "themes"
+)
+
+BATCH_SIZE = 500
+
+# review_daily_theme_rollup.theme is VARCHAR(100)
+THEME_MAX_LENGTH = 100
+
+def _review_row(bank_id, review_data):
+    """Map an analyzed-review record onto the reviews table columns"""
+    def value(key, default=None):
+        v = review_data.get(key, default)
+        if not isinstance(v, (list, str)) and pd.isna(v):
+            return default
+        return v.item() if hasattr(v, 'item') else v
+
+    return (
+        bank_id,
+        value('review'),
+        value('rating'),
+        value('date'),
+        value('sentiment'),
+        value('sentiment_score'),
+        value('source', 'unknown'),
+        value('language', 'en'),
+        # Convert themes list to PostgreSQL array format; anything the parser
+        # could not make sense of is clipped to fit the rollup's theme column
+        [theme[:THEME_MAX_LENGTH] for theme in parse_themes(review_data.get('themes', [])) if theme],
+    )
+
+def _prepare_rows(conn, bank_id, reviews):
+    """Build table rows and make sure their monthly partitions exist.
+
+    Reviews without a date cannot be stored in the date-partitioned table
+    and are skipped with a warning.
+    """
+    rows = [_review_row(bank_id, review) for review in reviews]
+    dated = [row for row in rows if row[3] is not None]
+    if len(dated) < len(rows):
+        print(f"Skipping {len(rows) - len(dated)} reviews without a date")
+    ensure_partitions(conn, {row[3] for row in dated})
+    return dated
+
+def _insert_reviews(cur, rows):
+    """Bulk insert prepared rows and update the rollup on an open cursor (no commit)"""
+    if not rows:
+        return []
+    query = f"INSERT INTO reviews ({', '.join(REVIEW_COLUMNS)}) VALUES %s RETURNING review_id"
+    review_ids = [r[0] for r in execute_values(cur, query, rows, page_size=BATCH_SIZE, fetch=True)]
+    update_daily_rollup(cur, review_ids, {row[3] for row in rows})
+    return review_ids
+
+def insert_reviews_batch(conn, bank_id, reviews):
+    """Bulk insert a batch of reviews and fold them into the daily rollup.
+
+    The insert and the rollup update commit together; returns the new review ids.
+    """
+    try:
+        rows = _prepare_rows(conn, bank_id, reviews)
+        with conn.cursor() as cur:
+            review_ids = _insert_reviews(cur, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return review_ids
+
+def _insert_rows_one_by_one(cur, rows):
+    """Insert prepared rows under a savepoint each, skipping (and reporting) the ones that fail"""
+    inserted = 0
+    for row in rows:
+        cur.execute("SAVEPOINT review_row")
+        try:
+            inserted += len(_insert_reviews(cur, [row]))
+        except Exception as e:
+            cur.execute("ROLLBACK TO SAVEPOINT review_row")
+            print(f"Skipping review dated {row[3]}: {e}")
+        else:
+            cur.execute("RELEASE SAVEPOINT review_row")
+    return inserted
+
+def insert_reviews_row_by_row(conn, bank_id, reviews):
+    """Insert reviews one at a time, skipping (and reporting) the ones that fail.
+
+    Fallback for a batch that insert_reviews_batch rejected, so a single bad
+    row does not cost the rest of the batch. The surviving rows commit
+    together; returns the number inserted.
+    """
+    try:
+        rows = _prepare_rows(conn, bank_id, reviews)
+        with conn.cursor() as cur:
+            inserted = _insert_rows_one_by_one(cur, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return inserted
+
+def _claim_batch(cur, batch_id):
+    """Record a batch id in loaded_batches; False if it was already loaded"""
+    cur.execute("INSERT INTO loaded_batches (batch_id) VALUES (%s) ON CONFLICT DO NOTHING", (batch_id,))
+    return cur.rowcount == 1
+
 def insert_review_data(conn, bank_id, review_data):
     """Insert review data into the database"""
-    with conn.cursor() as cur:
-        # Convert themes list to PostgreSQL array format
-        themes = review_data.get('themes', [])
-        if isinstance(themes, str):
-            themes = [themes]
-        
-        # Prepare the insert query
-        query = """
-        INSERT INTO reviews (
-            bank_id, review_text, rating, review_date, 
-            sentiment_label, sentiment_score, source, language, themes
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        # Execute the query
-        cur.execute(query, (
-            bank_id,
-            review_data.get('review'),
-            review_data.get('rating'),
-            review_data.get('date'),
-            review_data.get('sentiment'),
-            review_data.get('sentiment_score'),
-            review_data.get('source', 'unknown'),
-            review_data.get('language', 'en'),
-            themes
-        ))
-        conn.commit()
+    insert_reviews_batch(conn, bank_id, [review_data])
+
+class StreamingReviewWriter:
+    """Background writer that bulk-loads analyzed review batches into PostgreSQL.
+
+    Batches handed to put() are written by one worker thread over its own
+    connection, so database writes overlap with the caller's work (model
+    inference). The queue is bounded: put() blocks while the writer is
+    max_pending batches behind. Each batch (reviews of any number of banks)
+    is inserted and rolled up in a single transaction; if the batch insert
+    fails, its rows are retried one by one in the same transaction and the
+    bad ones are skipped. A batch_id given to put() is recorded in
+    loaded_batches in that transaction, and a batch whose id is already
+    there is skipped, so replaying a batch after a crash does not load it
+    twice. on_committed(tag) is called after the batch commits (or is
+    skipped). Any other write error stops the writer and is re-raised from
+    the next put() or from close().
+    """
+
+    _STOP = object()
+
+    def __init__(self, max_pending=4, on_committed=None, connect=get_db_connection):
+        self.on_committed = on_committed
+        self.rows_written = 0
+        self.error = None
+        self._connect = connect
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._bank_ids = {}
+        self._thread = threading.Thread(target=self._run, name="review-db-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, reviews, tag=None, batch_id=None):
+        """Queue a list of analyzed-review records (dicts with a 'bank' key)"""
+        self._put((reviews, tag, batch_id))
+
+    def close(self):
+        """Wait for queued batches to be written, then stop the worker"""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        if self.error:
+            raise self.error
+
+    def _put(self, item):
+        while True:
+            if self.error:
+                raise self.error
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self):
+        conn = None
+        try:
+            conn = self._connect()
+        except Exception as e:
+            self.error = e
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            if self.error:
+                continue  # keep draining so producers never block forever
+            reviews, tag, batch_id = item
+            try:
+                self._write(conn, reviews, batch_id)
+                if self.on_committed:
+                    self.on_committed(tag)
+            except Exception as e:
+                self.error = e
+        if conn is not None:
+            conn.close()
+
+    def _write(self, conn, reviews, batch_id=None):
+        by_bank = {}
+        for review in reviews:
+            by_bank.setdefault(review['bank'], []).append(review)
+        for bank_name in by_bank:
+            if bank_name not in self._bank_ids:
+                self._bank_ids[bank_name] = insert_bank_data(conn, bank_name)
+        try:
+            rows = [row for bank_name, bank_reviews in by_bank.items()
+                    for row in _prepare_rows(conn, self._bank_ids[bank_name], bank_reviews)]
+            with conn.cursor() as cur:
+                if batch_id is not None and not _claim_batch(cur, batch_id):
+                    print(f"Batch {batch_id} is already in the database; skipping")
+                    conn.rollback()
+                    return
+                cur.execute("SAVEPOINT review_batch")
+                try:
+                    written = len(_insert_reviews(cur, rows))
+                except Exception as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT review_batch")
+                    print(f"Error writing batch of {len(rows)} reviews: {e}; retrying row by row")
+                    written = _insert_rows_one_by_one(cur, rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self.rows_written += written
 
 def main():
     # Load your cleaned data
@@ -81,15 +274,16 @@ def main():
             # Insert bank and get bank_id
             bank_id = insert_bank_data(conn, bank_name)
             
-            # Insert reviews for this bank
-            bank_reviews = df[df['bank'] == bank_name]
-            for _, review in bank_reviews.iterrows():
+            # Insert reviews for this bank in batches
+            bank_reviews = df[df['bank'] == bank_name].to_dict('records')
+            for start in range(0, len(bank_reviews), BATCH_SIZE):
+                batch = bank_reviews[start:start + BATCH_SIZE]
                 try:
-                    insert_review_data(conn, bank_id, review.to_dict())
+                    insert_reviews_batch(conn, bank_id, batch)
                 except Exception as e:
-                    print(f"Error inserting review: {e}")
-                    conn.rollback()
-                    continue
+                    print(f"Error inserting batch of {len(batch)} reviews: {e}; retrying row by row")
+                    inserted = insert_reviews_row_by_row(conn, bank_id, batch)
+                    print(f"Inserted {inserted} of {len(batch)} reviews from the failed batch")
         
         print("Data loading completed successfully!")
         
@@ -99,4 +293,4 @@ def main():
         conn.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,219 @@
+import os
+import re
+import argparse
+from datetime import date
+
+import psycopg2
+from dotenv import load_dotenv
+
+from database_setup import TABLE_COMMANDS
+
+# Load environment variables
+load_dotenv()
+
+# Monthly partitions of reviews are named reviews_y2025m10. When
+# REVIEWS_BANK_PARTITIONS is set to N > 0, new months are further split into
+# N hash partitions on bank_id (reviews_y2025m10_b0 ... b{N-1}).
+PARTITION_RE = re.compile(r"^reviews_y(\d{4})m(\d{2})$")
+
+
+def get_db_connection():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME", "bank_reviews"),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASSWORD", ""),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", "5432")
+    )
+
+
+def month_start(value):
+    """First day of the month of a date or 'YYYY-MM-DD...' string."""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return date(value.year, value.month, 1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"reviews_y{month.year:04d}m{month.month:02d}"
+
+
+def list_partitions(cur):
+    """Monthly partitions of reviews as (month, name), oldest first."""
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'reviews'::regclass
+    """)
+    partitions = []
+    for (name,) in cur.fetchall():
+        match = PARTITION_RE.match(name)
+        if match:
+            partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(partitions)
+
+
+def _create_partition(cur, month):
+    name = partition_name(month)
+    buckets = int(os.getenv("REVIEWS_BANK_PARTITIONS", "0"))
+    sub_partition = " PARTITION BY HASH (bank_id)" if buckets > 0 else ""
+    cur.execute(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF reviews "
+        f"FOR VALUES FROM (%s) TO (%s){sub_partition}",
+        (month, next_month(month))
+    )
+    for remainder in range(buckets):
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {name}_b{remainder} PARTITION OF {name} "
+            f"FOR VALUES WITH (MODULUS {buckets}, REMAINDER {remainder})"
+        )
+
+
+def ensure_partitions(conn, dates):
+    """Create the monthly partitions needed to hold the given review dates.
+
+    Runs (and commits) in its own short transaction before the data insert,
+    so the insert transaction never holds DDL locks; on error it is rolled
+    back, leaving the connection usable. An advisory lock keeps
+    concurrent loaders from racing on the same new partition.
+    """
+    months = {month_start(d) for d in dates if d is not None}
+    if not months:
+        return
+    try:
+        with conn.cursor() as cur:
+            existing = {month for month, _ in list_partitions(cur)}
+            missing = sorted(months - existing)
+            if not missing:
+                return
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('reviews_partitions'))")
+            for month in missing:
+                _create_partition(cur, month)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def old_partitions(cur, before):
+    """Partitions whose whole month lies before the cutoff date."""
+    cutoff = date.fromisoformat(before)
+    return [(month, name) for month, name in list_partitions(cur) if next_month(month) <= cutoff]
+
+
+def detach_partitions(conn, before):
+    """Detach partitions older than the cutoff; they stay as standalone tables."""
+    with conn.cursor() as cur:
+        partitions = old_partitions(cur, before)
+        for _, name in partitions:
+            cur.execute(f"ALTER TABLE reviews DETACH PARTITION {name}")
+    conn.commit()
+    return [name for _, name in partitions]
+
+
+def drop_partitions(conn, before):
+    """Drop partitions older than the cutoff.
+
+    The daily rollups keep their history; rollup.py rebuild only replaces
+    days from the oldest remaining partition on, unless given an earlier
+    --since.
+    """
+    with conn.cursor() as cur:
+        partitions = old_partitions(cur, before)
+        for _, name in partitions:
+            cur.execute(f"DROP TABLE {name}")
+    conn.commit()
+    return [name for _, name in partitions]
+
+
+def migrate_unpartitioned(conn):
+    """Move an existing plain reviews table into the partitioned layout.
+
+    The old table is kept as reviews_unpartitioned (with any rows lacking a
+    review_date or bank_id, which the partitioned table cannot hold) for
+    manual cleanup.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('reviews')")
+        row = cur.fetchone()
+        if row is None or row[0] == 'p':
+            return None
+
+        # Free the names the new table and its indexes will use
+        cur.execute("ALTER TABLE reviews RENAME TO reviews_unpartitioned")
+        cur.execute("ALTER TABLE reviews_unpartitioned RENAME CONSTRAINT reviews_pkey TO reviews_unpartitioned_pkey")
+        cur.execute("""
+            SELECT indexname FROM pg_indexes
+            WHERE tablename = 'reviews_unpartitioned' AND indexname LIKE 'idx\\_reviews\\_%'
+        """)
+        for (index,) in cur.fetchall():
+            cur.execute(f"ALTER INDEX {index} RENAME TO {index.replace('idx_reviews_', 'idx_reviews_unpartitioned_', 1)}")
+        cur.execute("ALTER SEQUENCE IF EXISTS reviews_review_id_seq RENAME TO reviews_unpartitioned_review_id_seq")
+
+        for command in TABLE_COMMANDS:
+            cur.execute(command)
+        cur.execute("SELECT DISTINCT date_trunc('month', review_date)::date FROM reviews_unpartitioned "
+                    "WHERE review_date IS NOT NULL")
+        for (month,) in cur.fetchall():
+            _create_partition(cur, month)
+
+        cur.execute("""
+            INSERT INTO reviews (
+                review_id, bank_id, review_text, rating, review_date, sentiment_label,
+                sentiment_score, source, language, themes, created_at
+            )
+            SELECT review_id, bank_id, review_text, rating, review_date, sentiment_label,
+                   sentiment_score, source, language, themes, created_at
+            FROM reviews_unpartitioned
+            WHERE review_date IS NOT NULL AND bank_id IS NOT NULL
+        """)
+        moved = cur.rowcount
+        cur.execute("SELECT setval(pg_get_serial_sequence('reviews', 'review_id'), "
+                    "GREATEST((SELECT MAX(review_id) FROM reviews_unpartitioned), 1))")
+    conn.commit()
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of the reviews table.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="Show the monthly partitions")
+    for command in ("detach", "drop"):
+        p = sub.add_parser(command, help=f"{command.title()} partitions entirely before a date")
+        p.add_argument("--before", required=True, help="Cutoff date (YYYY-MM-DD)")
+    sub.add_parser("migrate", help="Convert an existing unpartitioned reviews table")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        if args.command == "list":
+            with conn.cursor() as cur:
+                for month, name in list_partitions(cur):
+                    print(f"{month:%Y-%m}  {name}")
+        elif args.command == "detach":
+            names = detach_partitions(conn, args.before)
+            print(f"Detached {len(names)} partitions: {', '.join(names)}")
+        elif args.command == "drop":
+            names = drop_partitions(conn, args.before)
+            print(f"Dropped {len(names)} partitions: {', '.join(names)}")
+        elif args.command == "migrate":
+            moved = migrate_unpartitioned(conn)
+            if moved is None:
+                print("reviews is already partitioned (or missing); nothing to migrate")
+            else:
+                print(f"Moved {moved} reviews into the partitioned table; "
+                      "the old table is kept as reviews_unpartitioned")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error managing partitions: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
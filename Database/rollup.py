@@ -0,0 +1,141 @@
+import os
+import argparse
+
+import psycopg2
+from dotenv import load_dotenv
+
+from partitions import list_partitions
+
+# Load environment variables
+load_dotenv()
+
+# Aggregates reviews into (bank, day, language, sentiment) buckets. The
+# {where} placeholder restricts the source rows: the loader passes the ids and
+# dates of the batch it just inserted, the rebuild the days it replaces.
+DAILY_ROLLUP_SQL = """
+INSERT INTO review_daily_rollup (
+    bank_id, day, language, sentiment_label,
+    review_count, score_count, score_sum, rating_count, rating_sum
+)
+SELECT r.bank_id,
+       r.review_date,
+       COALESCE(r.language, 'unknown'),
+       COALESCE(r.sentiment_label, 'UNKNOWN'),
+       COUNT(*),
+       COUNT(r.sentiment_score),
+       COALESCE(SUM(r.sentiment_score), 0),
+       COUNT(r.rating),
+       COALESCE(SUM(r.rating), 0)
+FROM reviews r
+WHERE r.review_date IS NOT NULL {where}
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (bank_id, day, language, sentiment_label) DO UPDATE SET
+    review_count = review_daily_rollup.review_count + EXCLUDED.review_count,
+    score_count = review_daily_rollup.score_count + EXCLUDED.score_count,
+    score_sum = review_daily_rollup.score_sum + EXCLUDED.score_sum,
+    rating_count = review_daily_rollup.rating_count + EXCLUDED.rating_count,
+    rating_sum = review_daily_rollup.rating_sum + EXCLUDED.rating_sum
+"""
+
+THEME_ROLLUP_SQL = """
+INSERT INTO review_daily_theme_rollup (
+    bank_id, day, language, sentiment_label, theme, theme_count
+)
+SELECT r.bank_id,
+       r.review_date,
+       COALESCE(r.language, 'unknown'),
+       COALESCE(r.sentiment_label, 'UNKNOWN'),
+       t.theme,
+       COUNT(*)
+FROM reviews r
+CROSS JOIN LATERAL unnest(r.themes) AS t(theme)
+WHERE r.review_date IS NOT NULL {where}
+GROUP BY 1, 2, 3, 4, 5
+ON CONFLICT (bank_id, day, language, sentiment_label, theme) DO UPDATE SET
+    theme_count = review_daily_theme_rollup.theme_count + EXCLUDED.theme_count
+"""
+
+
+def get_db_connection():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME", "bank_reviews"),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASSWORD", ""),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", "5432")
+    )
+
+
+def batch_filter(review_ids, days):
+    """{where} clause and params selecting a loaded batch.
+
+    The batch's review dates let the planner prune the monthly partitions of
+    reviews, so the cost does not grow with the history kept.
+    """
+    where = "AND r.review_id = ANY(%s) AND r.review_date = ANY(%s::date[])"
+    return where, (list(review_ids), sorted({str(day) for day in days}))
+
+
+def update_daily_rollup(cur, review_ids, days):
+    """Add a batch of freshly inserted reviews (and their dates) to the rollup tables.
+
+    Must run in the same transaction as the insert so the rollup never
+    counts a review that was rolled back (or misses one that was committed).
+    """
+    if not review_ids:
+        return
+    where, params = batch_filter(review_ids, days)
+    cur.execute(DAILY_ROLLUP_SQL.format(where=where), params)
+    cur.execute(THEME_ROLLUP_SQL.format(where=where), params)
+
+
+def rebuild_daily_rollup(conn, since=None):
+    """Recompute the rollup tables from the reviews (for backfills or repairs).
+
+    Only days from `since` on are replaced. By default that is the first day
+    of the oldest reviews partition, so the history of dropped (or detached)
+    partitions, which only the rollups still hold, is kept. Returns the first
+    day replaced, or None when there are no partitions to rebuild from.
+    """
+    with conn.cursor() as cur:
+        cur.execute("LOCK TABLE reviews IN SHARE MODE")
+        if since is None:
+            partitions = list_partitions(cur)
+            if not partitions:
+                conn.rollback()
+                return None
+            since = partitions[0][0]
+        params = (str(since),)
+        cur.execute("DELETE FROM review_daily_rollup WHERE day >= %s", params)
+        cur.execute("DELETE FROM review_daily_theme_rollup WHERE day >= %s", params)
+        cur.execute(DAILY_ROLLUP_SQL.format(where="AND r.review_date >= %s"), params)
+        cur.execute(THEME_ROLLUP_SQL.format(where="AND r.review_date >= %s"), params)
+    conn.commit()
+    return since
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the daily review rollup tables.")
+    parser.add_argument("command", choices=["rebuild"],
+                        help="rebuild: recompute the rollups from the reviews table")
+    parser.add_argument("--since", help="First day to recompute (YYYY-MM-DD); earlier days are kept. "
+                                        "Default: the start of the oldest reviews partition, so the "
+                                        "history of dropped partitions survives")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        since = rebuild_daily_rollup(conn, args.since)
+        if since is None:
+            print("No reviews partitions; rollup left unchanged")
+        else:
+            print(f"Daily rollup rebuilt from {since}")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error rebuilding rollup: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import ast
+import glob
+import hashlib
+
+# Helpers for reading the analyzed_reviews_*.csv files written by
+# sentiment_analysis.py. Kept free of plotting imports and import-time side
+# effects so the loader, monitor and search scripts can share them.
+
+DATA_DIR = os.path.join("data")
+
+
+def get_latest_analyzed_file(data_dir: str = DATA_DIR) -> str:
+    """Find the latest analyzed_reviews_*.csv file in data/."""
+    pattern = os.path.join(data_dir, "analyzed_reviews_*.csv")
+    files = glob.glob(pattern)
+    if not files:
+        raise FileNotFoundError(f"No analyzed_reviews_*.csv found in {data_dir}")
+    # sort by modified time, pick latest
+    files.sort(key=os.path.getmtime, reverse=True)
+    return files[0]
+
+
+def review_key(bank, review_date, review) -> str:
+    """Stable per-review key: SHA-1 of bank, date and review text."""
+    raw = f"{bank}\x1f{review_date}\x1f{review}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def parse_themes(x):
+    """Safely parse theme strings into Python lists."""
+    if x is None:
+        return []
+    if isinstance(x, float):  # catches NaN
+        return []
+    if isinstance(x, list):
+        return x
+    if not isinstance(x, str):
+        return []
+
+    x = x.strip()
+    if x == "" or x == "[]":
+        return []
+
+    # Try literal_eval first
+    try:
+        result = ast.literal_eval(x)
+        if isinstance(result, list):
+            return [str(t) for t in result]
+    except Exception:
+        pass
+
+    # Fallback: manual split
+    try:
+        cleaned = x.strip("[]")
+        parts = [p.strip().strip("'").strip('"') for p in cleaned.split(",")]
+        return [p for p in parts if p]
+    except Exception:
+        return []
@@ -1,66 +1,32 @@
 import os
-import glob
-import ast
+import sys
+import argparse
 from collections import Counter
 from datetime import datetime
 
 import pandas as pd
+import psycopg2
 import matplotlib.pyplot as plt
 import seaborn as sns
+from dotenv import load_dotenv
+
+# Set up paths
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from scripts.analyzed_data import get_latest_analyzed_file, parse_themes  # noqa: E402
 
 # ---------- CONFIG ----------
-DATA_DIR = os.path.join("data")
 VIS_DIR = os.path.join("visualizations")
 
 os.makedirs(VIS_DIR, exist_ok=True)
 
 sns.set_theme(style="whitegrid")
 
+load_dotenv()
 
-# ---------- DATA LOADING ----------
-
-def get_latest_analyzed_file(data_dir: str = DATA_DIR) -> str:
-    """Find the latest analyzed_reviews_*.csv file in data/."""
-    pattern = os.path.join(data_dir, "analyzed_reviews_*.csv")
-    files = glob.glob(pattern)
-    if not files:
-        raise FileNotFoundError(f"No analyzed_reviews_*.csv found in {data_dir}")
-    # sort by modified time, pick latest
-    files.sort(key=os.path.getmtime, reverse=True)
-    return files[0]
-
-
-def parse_themes(x):
-    """Safely parse theme strings into Python lists."""
-    if x is None:
-        return []
-    if isinstance(x, float):  # catches NaN
-        return []
-    if isinstance(x, list):
-        return x
-    if not isinstance(x, str):
-        return []
-
-    x = x.strip()
-    if x == "" or x == "[]":
-        return []
-
-    # Try literal_eval first
-    try:
-        result = ast.literal_eval(x)
-        if isinstance(result, list):
-            return result
-    except Exception:
-        pass
-
-    # Fallback: manual split
-    try:
-        cleaned = x.strip("[]")
-        parts = [p.strip().strip("'").strip('"') for p in cleaned.split(",")]
-        return [p for p in parts if p]
-    except Exception:
-        return []
 
+# ---------- DATA LOADING ----------
 
 def load_data() -> pd.DataFrame:
     """Load the latest analyzed reviews CSV and prepare columns."""
@@ -80,7 +46,10 @@ def load_data() -> pd.DataFrame:
 # ---------- INSIGHT FUNCTIONS ----------
 
 def top_themes(df: pd.DataFrame, bank: str, sentiment: str | None = None, n: int = 5):
-    """Return top N themes for a bank, optionally filtered by sentiment."""
+    """Return top N themes for a bank, optionally filtered by sentiment.
+
+    Ties are broken alphabetically so the CSV and DB backends agree.
+    """
     temp = df[df["bank"] == bank]
     if sentiment:
         temp = temp[temp["sentiment"].str.upper() == sentiment.upper()]
@@ -93,7 +62,8 @@ def top_themes(df: pd.DataFrame, bank: str, sentiment: str | None = None, n: int
     if not theme_list:
         return []
 
-    return Counter(theme_list).most_common(n)
+    counts = sorted(Counter(theme_list).items(), key=lambda x: (-x[1], x[0]))
+    return counts[:n]
 
 
 def compute_bank_metrics(df: pd.DataFrame) -> pd.DataFrame:
@@ -103,15 +73,189 @@ def compute_bank_metrics(df: pd.DataFrame) -> pd.DataFrame:
         avg_sentiment=("sentiment_score", "mean"),
         review_count=("review", "count"),
     )
-    return grouped.sort_values("review_count", ascending=False).reset_index()
+    grouped = grouped.reset_index()
+    return grouped.sort_values(
+        ["review_count", "bank"], ascending=[False, True]
+    ).reset_index(drop=True)
+
+
+TREND_PERIODS = {"day": "D", "week": "W", "month": "M"}
+
+
+def sentiment_trend(df: pd.DataFrame, bank: str, granularity: str = "month") -> pd.Series:
+    """Mean sentiment score for a bank per day/week/month, indexed by bucket start."""
+    temp = df[df["bank"] == bank].copy()
+    if temp.empty:
+        return pd.Series(dtype=float, name="sentiment_score")
+
+    temp[granularity] = temp["date"].dt.to_period(TREND_PERIODS[granularity])
+    trend = temp.groupby(granularity)["sentiment_score"].mean()
+    trend.index = pd.DatetimeIndex(trend.index.to_timestamp().values, name=granularity)
+    return trend
+
+
+def sentiment_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Number of reviews per (bank, sentiment)."""
+    counts = df.groupby(["bank", "sentiment"]).size().reset_index(name="count")
+    return counts.sort_values(["bank", "sentiment"]).reset_index(drop=True)
+
+
+def rating_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Number of reviews per rating value."""
+    counts = df.groupby("rating").size().reset_index(name="count")
+    return counts.sort_values("rating").reset_index(drop=True)
+
+
+# ---------- BACKENDS ----------
+
+class CsvInsightsBackend:
+    """Insights computed in pandas over the latest analyzed CSV."""
+
+    def __init__(self, df: pd.DataFrame | None = None):
+        self.df = load_data() if df is None else df
+
+    def bank_metrics(self) -> pd.DataFrame:
+        return compute_bank_metrics(self.df)
+
+    def top_themes(self, bank: str, sentiment: str | None = None, n: int = 5):
+        return top_themes(self.df, bank, sentiment=sentiment, n=n)
+
+    def sentiment_trend(self, bank: str, granularity: str = "month") -> pd.Series:
+        return sentiment_trend(self.df, bank, granularity)
+
+    def sentiment_counts(self) -> pd.DataFrame:
+        return sentiment_counts(self.df)
+
+    def rating_counts(self) -> pd.DataFrame:
+        return rating_counts(self.df)
+
+    def close(self):
+        pass
+
+
+def get_db_connection():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME", "bank_reviews"),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASSWORD", ""),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", "5432")
+    )
+
+
+class DbInsightsBackend:
+    """Insights computed as SQL aggregations over the reviews/banks tables.
+
+    Only the aggregated result sets are fetched; the outputs have the same
+    shape and ordering as CsvInsightsBackend.
+    """
+
+    def __init__(self, conn=None):
+        self.conn = conn or get_db_connection()
+
+    def _fetch(self, query, params=None):
+        with self.conn.cursor() as cur:
+            cur.execute(query, params)
+            columns = [c[0] for c in cur.description]
+            return pd.DataFrame(cur.fetchall(), columns=columns)
+
+    def bank_metrics(self) -> pd.DataFrame:
+        query = """
+        SELECT b.bank_name AS bank,
+               AVG(r.rating)::float AS avg_rating,
+               AVG(r.sentiment_score)::float AS avg_sentiment,
+               COUNT(r.review_text) AS review_count
+        FROM reviews r
+        JOIN banks b ON r.bank_id = b.bank_id
+        GROUP BY b.bank_name
+        ORDER BY review_count DESC, bank
+        """
+        df = self._fetch(query)
+        df["review_count"] = df["review_count"].astype("int64")
+        return df
+
+    def top_themes(self, bank: str, sentiment: str | None = None, n: int = 5):
+        query = """
+        SELECT t.theme, COUNT(*) AS count
+        FROM reviews r
+        JOIN banks b ON r.bank_id = b.bank_id
+        CROSS JOIN LATERAL unnest(r.themes) AS t(theme)
+        WHERE b.bank_name = %s
+          AND (%s IS NULL OR r.sentiment_label = UPPER(%s))
+        GROUP BY t.theme
+        ORDER BY count DESC, t.theme
+        LIMIT %s
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(query, (bank, sentiment, sentiment, n))
+            return [(theme, int(count)) for theme, count in cur.fetchall()]
+
+    def sentiment_trend(self, bank: str, granularity: str = "month") -> pd.Series:
+        # Read from the daily rollup maintained by the loader, so the cost is
+        # proportional to the number of days, not the number of reviews
+        if granularity not in TREND_PERIODS:
+            raise ValueError(f"Unknown trend granularity: {granularity}")
+        query = f"""
+        SELECT date_trunc('{granularity}', d.day)::timestamp AS {granularity},
+               (SUM(d.score_sum) / NULLIF(SUM(d.score_count), 0))::float AS sentiment_score
+        FROM review_daily_rollup d
+        JOIN banks b ON d.bank_id = b.bank_id
+        WHERE b.bank_name = %s
+        GROUP BY 1
+        ORDER BY 1
+        """
+        df = self._fetch(query, (bank,))
+        if df.empty:
+            return pd.Series(dtype=float, name="sentiment_score")
+        trend = df.set_index(granularity)["sentiment_score"]
+        trend.index = pd.to_datetime(trend.index)
+        return trend
+
+    def sentiment_counts(self) -> pd.DataFrame:
+        query = """
+        SELECT b.bank_name AS bank, r.sentiment_label AS sentiment, COUNT(*) AS count
+        FROM reviews r
+        JOIN banks b ON r.bank_id = b.bank_id
+        WHERE r.sentiment_label IS NOT NULL
+        GROUP BY b.bank_name, r.sentiment_label
+        ORDER BY bank, sentiment
+        """
+        df = self._fetch(query)
+        df["count"] = df["count"].astype("int64")
+        return df
+
+    def rating_counts(self) -> pd.DataFrame:
+        query = """
+        SELECT rating, COUNT(*) AS count
+        FROM reviews
+        WHERE rating IS NOT NULL
+        GROUP BY rating
+        ORDER BY rating
+        """
+        df = self._fetch(query)
+        df["count"] = df["count"].astype("int64")
+        return df
+
+    def close(self):
+        self.conn.close()
+
+
+def get_backend(name: str = "csv"):
+    """Return the insights backend selected by name ('csv' or 'db')."""
+    if name == "csv":
+        return CsvInsightsBackend()
+    if name == "db":
+        return DbInsightsBackend()
+    raise ValueError(f"Unknown insights backend: {name}")
 
 
 # ---------- PLOTTING FUNCTIONS ----------
 
-def plot_sentiment_distribution(df: pd.DataFrame):
+def plot_sentiment_distribution(backend):
     """Plot count of sentiment per bank."""
+    counts = backend.sentiment_counts()
     plt.figure(figsize=(10, 6))
-    sns.countplot(data=df, x="bank", hue="sentiment")
+    sns.barplot(data=counts, x="bank", y="count", hue="sentiment")
     plt.title("Sentiment Distribution per Bank")
     plt.xlabel("Bank")
     plt.ylabel("Number of Reviews")
@@ -124,10 +268,11 @@ def plot_sentiment_distribution(df: pd.DataFrame):
     print(f"Saved: {out_path}")
 
 
-def plot_rating_distribution(df: pd.DataFrame):
+def plot_rating_distribution(backend):
     """Plot overall rating distribution."""
+    counts = backend.rating_counts()
     plt.figure(figsize=(8, 5))
-    sns.histplot(data=df, x="rating", bins=5, kde=True)
+    sns.histplot(data=counts, x="rating", weights="count", bins=5, kde=True)
     plt.title("Overall Rating Distribution")
     plt.xlabel("Rating")
     plt.ylabel("Count")
@@ -139,18 +284,14 @@ def plot_rating_distribution(df: pd.DataFrame):
     print(f"Saved: {out_path}")
 
 
-def plot_sentiment_trend(df: pd.DataFrame, bank: str):
+def plot_sentiment_trend(backend, bank: str):
     """Plot sentiment score trend over time for a single bank."""
-    temp = df[df["bank"] == bank].copy()
-    if temp.empty:
+    trend = backend.sentiment_trend(bank)
+    if trend.empty:
         print(f"No data for bank: {bank}")
         return
 
-    temp["month"] = temp["date"].dt.to_period("M")
-    trend = temp.groupby("month")["sentiment_score"].mean()
-
     plt.figure(figsize=(9, 4))
-    trend.index = trend.index.to_timestamp()
     plt.plot(trend.index, trend.values, marker="o")
     plt.title(f"Sentiment Trend Over Time - {bank}")
     plt.xlabel("Month")
@@ -164,9 +305,9 @@ def plot_sentiment_trend(df: pd.DataFrame, bank: str):
     print(f"Saved: {out_path}")
 
 
-def plot_top_themes(df: pd.DataFrame, bank: str, sentiment: str | None = None):
+def plot_top_themes(backend, bank: str, sentiment: str | None = None):
     """Barplot of top 10 themes for a bank (optionally filtered by sentiment)."""
-    tt = top_themes(df, bank, sentiment=sentiment, n=10)
+    tt = backend.top_themes(bank, sentiment=sentiment, n=10)
     if not tt:
         print(f"No themes for bank: {bank} (sentiment={sentiment})")
         return
@@ -193,34 +334,42 @@ def plot_top_themes(df: pd.DataFrame, bank: str, sentiment: str | None = None):
 
 # ---------- MAIN TASK-4 PIPELINE ----------
 
-def main():
-    df = load_data()
-
-    print("\n=== Per-bank metrics ===")
-    metrics = compute_bank_metrics(df)
-    print(metrics.to_string(index=False))
-
-    banks = metrics["bank"].tolist()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Task 4 insights and plots.")
+    parser.add_argument("--backend", choices=["csv", "db"], default="csv",
+                        help="Read from the latest analyzed CSV or aggregate in PostgreSQL")
+    args = parser.parse_args(argv)
 
-    # Drivers & pain points per bank
-    print("\n=== Drivers & Pain Points (by themes) ===")
-    for bank in banks:
-        drivers = top_themes(df, bank, sentiment="POSITIVE", n=5)
-        pains = top_themes(df, bank, sentiment="NEGATIVE", n=5)
+    backend = get_backend(args.backend)
 
-        print(f"\nBank: {bank}")
-        print(f"  Drivers (POSITIVE themes): {drivers}")
-        print(f"  Pain points (NEGATIVE themes): {pains}")
-
-    # Required plots (3–5):
-    plot_sentiment_distribution(df)
-    plot_rating_distribution(df)
-
-    # Sentiment trend + themes for first 1–2 banks (for evidence)
-    for bank in banks[:2]:
-        plot_sentiment_trend(df, bank)
-        plot_top_themes(df, bank, sentiment="POSITIVE")
-        plot_top_themes(df, bank, sentiment="NEGATIVE")
+    try:
+        print("\n=== Per-bank metrics ===")
+        metrics = backend.bank_metrics()
+        print(metrics.to_string(index=False))
+
+        banks = metrics["bank"].tolist()
+
+        # Drivers & pain points per bank
+        print("\n=== Drivers & Pain Points (by themes) ===")
+        for bank in banks:
+            drivers = backend.top_themes(bank, sentiment="POSITIVE", n=5)
+            pains = backend.top_themes(bank, sentiment="NEGATIVE", n=5)
+
+            print(f"\nBank: {bank}")
+            print(f"  Drivers (POSITIVE themes): {drivers}")
+            print(f"  Pain points (NEGATIVE themes): {pains}")
+
+        # Required plots (3–5):
+        plot_sentiment_distribution(backend)
+        plot_rating_distribution(backend)
+
+        # Sentiment trend + themes for first 1–2 banks (for evidence)
+        for bank in banks[:2]:
+            plot_sentiment_trend(backend, bank)
+            plot_top_themes(backend, bank, sentiment="POSITIVE")
+            plot_top_themes(backend, bank, sentiment="NEGATIVE")
+    finally:
+        backend.close()
 
     print("\nTask 4 insights and visualizations generated successfully.")
 
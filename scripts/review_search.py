@@ -0,0 +1,252 @@
+import os
+import re
+import sys
+import math
+import argparse
+from pathlib import Path
+
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+
+# Set up paths
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scripts.analyzed_data import get_latest_analyzed_file, parse_themes
+
+load_dotenv()
+
+# Ethiopic word separators and punctuation (፡ ። ፣ ፤ ፥ ፦ ፧ ፨) are mapped to
+# spaces before tokenizing, on both the database and the in-process side, so
+# Amharic words separated by them are indexed individually.
+ETHIOPIC_PUNCTUATION = "፡።፣፤፥፦፧፨"
+_ETHIOPIC_TO_SPACE = str.maketrans(ETHIOPIC_PUNCTUATION, " " * len(ETHIOPIC_PUNCTUATION))
+
+TOKEN_RE = re.compile(r"\w+")
+
+# PostgreSQL's 'english' stop words (tsearch_data/english.stop). The database
+# drops them from documents and queries, so the offline search ignores them in
+# queries too; inside a phrase they still take up a position.
+STOP_WORDS = frozenset("""
+i me my myself we our ours ourselves you your yours yourself yourselves he him
+his himself she her hers herself it its itself they them their theirs
+themselves what which who whom this that these those am is are was were be
+been being have has had having do does did doing a an the and but if or
+because as until while of at by for with about against between into through
+during before after above below to from up down in out on off over under
+again further then once here there when where why how all any both each few
+more most other some such no nor not only own same so than too very s t can
+will just don should now
+""".split())
+
+RESULT_COLUMNS = ["review_id", "bank", "date", "rating", "sentiment",
+                  "sentiment_score", "themes", "review", "rank"]
+
+
+def normalize_text(text):
+    return str(text).translate(_ETHIOPIC_TO_SPACE)
+
+
+def tokenize(text):
+    """Lowercased word tokens; \\w covers Ethiopic syllables."""
+    return TOKEN_RE.findall(normalize_text(text).lower())
+
+
+# ---------- DATABASE SEARCH ----------
+
+def get_db_connection():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME", "bank_reviews"),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASSWORD", ""),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", "5432")
+    )
+
+
+def search_reviews_db(conn, query, bank=None, start_date=None, end_date=None,
+                      sentiment=None, theme=None, limit=20, offset=0):
+    """Full-text search over reviews.search_tsv (GIN indexed).
+
+    query uses web-search syntax: words are AND-ed, "quoted phrases" must
+    appear in order, `or` separates alternatives and -word excludes.
+    Results are ordered by ts_rank_cd, newest review first on ties.
+    """
+    sql = """
+    SELECT r.review_id, b.bank_name AS bank, r.review_date AS date, r.rating,
+           r.sentiment_label AS sentiment, r.sentiment_score, r.themes,
+           r.review_text AS review, ts_rank_cd(r.search_tsv, q)::float AS rank
+    FROM reviews r
+    JOIN banks b ON r.bank_id = b.bank_id
+    CROSS JOIN websearch_to_tsquery('english', %(query)s) AS q
+    WHERE r.search_tsv @@ q
+      AND (%(bank)s IS NULL OR b.bank_name = %(bank)s)
+      AND (%(start_date)s IS NULL OR r.review_date >= %(start_date)s)
+      AND (%(end_date)s IS NULL OR r.review_date <= %(end_date)s)
+      AND (%(sentiment)s IS NULL OR r.sentiment_label = UPPER(%(sentiment)s))
+      AND (%(theme)s IS NULL OR r.themes @> ARRAY[%(theme)s]::text[])
+    ORDER BY rank DESC, r.review_id DESC
+    LIMIT %(limit)s OFFSET %(offset)s
+    """
+    params = {
+        "query": normalize_text(query), "bank": bank, "start_date": start_date,
+        "end_date": end_date, "sentiment": sentiment, "theme": theme,
+        "limit": limit, "offset": offset,
+    }
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        return pd.DataFrame(cur.fetchall(), columns=RESULT_COLUMNS)
+
+
+# ---------- IN-PROCESS FALLBACK ----------
+
+def parse_query(query):
+    """Parse a web-search style query into OR-groups.
+
+    Each group is a list of (excluded, tokens) terms; a document matches a
+    group when every non-excluded term (a word or phrase) occurs and no
+    excluded one does. Stop words become None (a gap inside a phrase);
+    terms made only of stop words are dropped.
+    """
+    groups = [[]]
+    for match in re.finditer(r'(-?)"([^"]*)"?|(\S+)', query):
+        if match.group(3) is not None:
+            word = match.group(3)
+            if word.lower() == "or":
+                groups.append([])
+                continue
+            excluded, text = word.startswith("-"), word.lstrip("-")
+        else:
+            excluded, text = match.group(1) == "-", match.group(2)
+        tokens = [None if token in STOP_WORDS else token for token in tokenize(text)]
+        while tokens and tokens[0] is None:
+            tokens.pop(0)
+        while tokens and tokens[-1] is None:
+            tokens.pop()
+        if tokens:
+            groups[-1].append((excluded, tokens))
+    return [group for group in groups if group]
+
+
+class ReviewIndex:
+    """Positional inverted index over an analyzed reviews file, for offline search.
+
+    Matching is on exact lowercased tokens (no stemming), so it is slightly
+    stricter than the database search; stop words are ignored in queries
+    as they are there.
+    """
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.postings = {}   # token -> {row: [positions]}
+        self.doc_lengths = []
+        for row, text in enumerate(self.df["review"].fillna("")):
+            tokens = tokenize(text)
+            self.doc_lengths.append(len(tokens))
+            for position, token in enumerate(tokens):
+                self.postings.setdefault(token, {}).setdefault(row, []).append(position)
+
+    @classmethod
+    def from_csv(cls, csv_path=None):
+        csv_path = csv_path or get_latest_analyzed_file()
+        df = pd.read_csv(csv_path)
+        df["date"] = pd.to_datetime(df["date"])
+        df["themes"] = df["themes"].apply(parse_themes)
+        return cls(df)
+
+    def _phrase_hits(self, tokens):
+        """{row: number of occurrences} for a word or phrase (None = any word)."""
+        postings = [(offset, self.postings.get(token, {})) for offset, token in enumerate(tokens)
+                    if token is not None]
+        rows = set(postings[0][1])
+        for _, posting in postings[1:]:
+            rows &= set(posting)
+        hits = {}
+        for row in rows:
+            count = sum(
+                1 for start in postings[0][1][row]
+                if all(start + offset in posting[row] for offset, posting in postings[1:])
+            )
+            if count:
+                hits[row] = count
+        return hits
+
+    def _match(self, query):
+        scores = {}
+        for group in parse_query(query):
+            required = [self._phrase_hits(tokens) for excluded, tokens in group if not excluded]
+            excluded = [self._phrase_hits(tokens) for excluded, tokens in group if excluded]
+            if not required:
+                continue
+            rows = set(required[0])
+            for hits in required[1:]:
+                rows &= set(hits)
+            for hits in excluded:
+                rows -= set(hits)
+            for row in rows:
+                score = sum(hits[row] for hits in required) / math.log(2 + self.doc_lengths[row])
+                scores[row] = max(scores.get(row, 0.0), score)
+        return scores
+
+    def search(self, query, bank=None, start_date=None, end_date=None,
+               sentiment=None, theme=None, limit=20, offset=0):
+        """Same filters, ordering and result columns as search_reviews_db."""
+        scores = self._match(query)
+        if not scores:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        hits = self.df.loc[sorted(scores)].copy()
+        hits["review_id"] = hits.index
+        hits["rank"] = [scores[row] for row in hits.index]
+        if bank:
+            hits = hits[hits["bank"] == bank]
+        if start_date:
+            hits = hits[hits["date"] >= pd.Timestamp(start_date)]
+        if end_date:
+            hits = hits[hits["date"] <= pd.Timestamp(end_date)]
+        if sentiment:
+            hits = hits[hits["sentiment"].str.upper() == sentiment.upper()]
+        if theme:
+            hits = hits[hits["themes"].apply(lambda themes: theme in themes)]
+        hits = hits.sort_values(["rank", "review_id"], ascending=[False, False])
+        return hits[RESULT_COLUMNS].iloc[offset:offset + limit].reset_index(drop=True)
+
+
+# ---------- CLI ----------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search reviews by text with optional filters.")
+    parser.add_argument("query", help='Web-search style query, e.g. \'OTP or "transfer failed"\'')
+    parser.add_argument("--backend", choices=["db", "file"], default="db",
+                        help="Search PostgreSQL or an in-memory index of the latest analyzed CSV")
+    parser.add_argument("--file", help="Analyzed CSV for --backend file (default: latest)")
+    parser.add_argument("--bank")
+    parser.add_argument("--since", help="Earliest review date (YYYY-MM-DD)")
+    parser.add_argument("--until", help="Latest review date (YYYY-MM-DD)")
+    parser.add_argument("--sentiment", choices=["POSITIVE", "NEGATIVE", "NEUTRAL"], type=str.upper)
+    parser.add_argument("--theme")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--page", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    filters = dict(bank=args.bank, start_date=args.since, end_date=args.until,
+                   sentiment=args.sentiment, theme=args.theme,
+                   limit=args.limit, offset=(args.page - 1) * args.limit)
+    if args.backend == "db":
+        conn = get_db_connection()
+        try:
+            results = search_reviews_db(conn, args.query, **filters)
+        finally:
+            conn.close()
+    else:
+        results = ReviewIndex.from_csv(args.file).search(args.query, **filters)
+
+    if results.empty:
+        print("No matching reviews.")
+        return
+    with pd.option_context("display.max_colwidth", 100):
+        print(results.drop(columns=["themes"]).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
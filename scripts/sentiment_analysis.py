@@ -1,4 +1,10 @@
 import os
+import sys
+import ast
+import json
+import hashlib
+import argparse
+import threading
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -10,7 +16,12 @@ from datetime import datetime
 
 # Set up paths
 PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scripts.analyzed_data import review_key
+
 DATA_DIR = PROJECT_ROOT / "data"
+RUNS_DIR = DATA_DIR / "runs"
 os.makedirs(DATA_DIR, exist_ok=True)
 
 # Set seed for language detection consistency
@@ -136,58 +147,374 @@ def extract_themes(text, language='en'):
     except Exception as e:
         return ['Error']
 
-def main():
-    global en_sentiment, multi_sentiment
-    print("Starting sentiment analysis...")
-    
-    # 1. Load data
-    input_path = DATA_DIR / "clean_reviews.csv"
-    print(f"Loading data from: {input_path}")
-    df = pd.read_csv(input_path)
-    print(f"Loaded {len(df)} reviews for analysis")
+def analyze_chunk(chunk):
+    """Add language, sentiment, sentiment_score and themes columns to a chunk of reviews."""
+    chunk = chunk.copy()
+    chunk['language'] = chunk['review'].apply(detect_language)
+    if chunk.empty:
+        chunk['sentiment'], chunk['sentiment_score'], chunk['themes'] = [], [], []
+        return chunk
+    chunk[['sentiment', 'sentiment_score']] = chunk.apply(
+        lambda x: pd.Series(analyze_sentiment(x['review'], x['language'])),
+        axis=1
+    )
+    chunk['themes'] = chunk.apply(lambda x: extract_themes(x['review'], x['language']), axis=1)
+    return chunk
+
+
+# ---------- CHECKPOINTED RUNS ----------
+# A run lives in data/runs/<run_id>/: one chunk_NNNNN.csv per finished chunk
+# plus manifest.json listing the completed chunks. Both are written to a
+# temporary file and renamed into place, so a crash never leaves a partial
+# chunk behind and --resume can pick up after the last completed one.
+
+# The manifest is also updated from the database writer thread (--db-sink)
+_manifest_lock = threading.RLock()
+
+def _atomic_write(path, write):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def save_manifest(run_dir, manifest):
+    with _manifest_lock:
+        _atomic_write(run_dir / "manifest.json", lambda f: json.dump(manifest, f, indent=2))
+
+
+def mark_chunk(run_dir, manifest, field, index):
+    """Record a chunk as done in manifest[field] and persist the manifest."""
+    with _manifest_lock:
+        manifest.setdefault(field, []).append(index)
+        save_manifest(run_dir, manifest)
+
+
+def load_manifest(run_dir):
+    with open(run_dir / "manifest.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def chunk_path(run_dir, index):
+    return run_dir / f"chunk_{index:05d}.csv"
+
+
+def input_fingerprint(input_path):
+    """SHA-1 of the input file's contents, recorded so --resume can't mix datasets."""
+    digest = hashlib.sha1()
+    with open(input_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def start_run(input_path, total_rows, chunk_size, run_id=None, shard=None):
+    """Create a run directory and its manifest; returns (run_dir, manifest)."""
+    if run_id is None:
+        run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if shard:
+            run_id += f"_shard{shard[0]}of{shard[1]}"
+    run_dir = RUNS_DIR / run_id
+    os.makedirs(run_dir, exist_ok=False)
+    manifest = {
+        "run_id": run_id,
+        "input_path": str(input_path),
+        "input_sha1": input_fingerprint(input_path),
+        "total_rows": total_rows,
+        "chunk_size": chunk_size,
+        "num_chunks": max(1, -(-total_rows // chunk_size)),
+        "shard": {"index": shard[0], "count": shard[1]} if shard else None,
+        "completed_chunks": [],
+        "status": "running",
+        "output_path": None,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    save_manifest(run_dir, manifest)
+    return run_dir, manifest
+
+
+def resume_run(run_id, input_path, total_rows, shard=None):
+    """Reopen an existing run, checking it was started on the same input."""
+    run_dir = RUNS_DIR / run_id
+    if not (run_dir / "manifest.json").exists():
+        raise FileNotFoundError(f"No run manifest found for run '{run_id}' in {RUNS_DIR}")
+    manifest = load_manifest(run_dir)
+    if manifest.get("input_sha1") != input_fingerprint(input_path):
+        raise ValueError(
+            f"Run '{run_id}' was started on {manifest['input_path']}, "
+            f"but the contents of {input_path} differ from it"
+        )
+    if manifest["total_rows"] != total_rows:
+        raise ValueError(
+            f"Run '{run_id}' was started on {manifest['total_rows']} rows, "
+            f"but the input now has {total_rows}"
+        )
+    expected_shard = {"index": shard[0], "count": shard[1]} if shard else None
+    if manifest.get("shard") != expected_shard:
+        raise ValueError(f"Run '{run_id}' was started with shard {manifest.get('shard')}, not {expected_shard}")
+    return run_dir, manifest
+
 
-    # 2. Language detection
-    print("\n🌐 Detecting languages in reviews...")
-    df['language'] = df['review'].apply(detect_language)
+def process_chunks(df, run_dir, manifest, on_chunk=None):
+    """Analyze every chunk not yet recorded in the manifest, checkpointing each one.
 
-    # 3. Sentiment Analysis
-    print("\n🔍 Running sentiment analysis...")
+    on_chunk(index, result), if given, is called after each chunk is checkpointed.
+    """
+    chunk_size = manifest["chunk_size"]
+    done = set(manifest["completed_chunks"])
+    for index in range(manifest["num_chunks"]):
+        if index in done:
+            continue
+        chunk = df.iloc[index * chunk_size:(index + 1) * chunk_size]
+        print(f"   Chunk {index + 1}/{manifest['num_chunks']} ({len(chunk)} reviews)")
+        result = analyze_chunk(chunk)
+        _atomic_write(chunk_path(run_dir, index), lambda f: result.to_csv(f, index=False))
+        mark_chunk(run_dir, manifest, "completed_chunks", index)
+        if on_chunk:
+            on_chunk(index, result)
+
+
+def compact_run(run_dir, manifest):
+    """Merge the completed chunks, in order, into one DataFrame."""
+    missing = sorted(set(range(manifest["num_chunks"])) - set(manifest["completed_chunks"]))
+    if missing:
+        raise RuntimeError(f"Run {manifest['run_id']} is missing chunks: {missing}")
+    chunks = [pd.read_csv(chunk_path(run_dir, i), dtype={'review_key': str})
+              for i in range(manifest["num_chunks"])]
+    df = pd.concat(chunks, ignore_index=True)
+    df['themes'] = df['themes'].apply(ast.literal_eval)
+    return df
+
+
+# ---------- SHARDING ----------
+# --shard i/N keeps only the reviews whose key hashes to shard i, so N
+# machines (or processes) can split a backfill without coordinating. Each
+# shard is an ordinary checkpointed run; --merge combines the shard runs.
+
+def review_keys(df):
+    """Stable per-review key: SHA-1 of bank, date and review text."""
+    def key(row):
+        return review_key(row['bank'], row['date'], row['review'])
+    return df.apply(key, axis=1) if not df.empty else pd.Series(dtype=str)
+
+
+def shard_of(key, count):
+    return int(key[:16], 16) % count
+
+
+def parse_shard(value):
+    """Parse 'i/N' (0 <= i < N) into (i, N)."""
     try:
-        # Load models
-        en_sentiment = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-        multi_sentiment = pipeline("sentiment-analysis", model="nlptown/bert-base-multilingual-uncased-sentiment")
-        print("   Models loaded successfully")
-    except Exception as e:
-        print(f"Error loading models: {e}")
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard must look like i/N, got '{value}'")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Shard index must satisfy 0 <= i < N, got '{value}'")
+    return index, count
+
+
+def select_shard(df, shard):
+    """Add the review_key column and keep only the rows belonging to shard (i, N)."""
+    df = df.copy()
+    df['review_key'] = review_keys(df)
+    index, count = shard
+    return df[df['review_key'].apply(shard_of, count=count) == index]
+
+
+def _occurrence(keys):
+    # Identical reviews share a key; number them so each row matches once
+    return keys.groupby(keys).cumcount()
+
+
+def _read_shard_runs(run_refs, report):
+    """Load the manifest and compacted chunks of each shard run."""
+    manifests, frames = [], []
+    for ref in run_refs:
+        run_dir = Path(ref) if Path(ref).is_dir() else RUNS_DIR / ref
+        try:
+            manifest = load_manifest(run_dir)
+        except FileNotFoundError:
+            report["errors"].append(f"No run manifest found for '{ref}' (looked in {run_dir})")
+            continue
+        if not manifest.get("shard"):
+            report["errors"].append(f"Run {manifest['run_id']} is not a shard run")
+            continue
+        manifests.append(manifest)
+        report["shards"].append({
+            "run_id": manifest["run_id"],
+            "shard": f"{manifest['shard']['index']}/{manifest['shard']['count']}",
+            "rows": manifest["total_rows"],
+            "completed_chunks": len(manifest["completed_chunks"]),
+            "num_chunks": manifest["num_chunks"],
+        })
+        try:
+            frames.append(compact_run(run_dir, manifest))
+        except RuntimeError as e:
+            report["errors"].append(str(e))
+    return manifests, frames
+
+
+def _check_shard_set(manifests, report):
+    """Every shard 0..N-1 of a single shard count must be given exactly once."""
+    counts = {m["shard"]["count"] for m in manifests}
+    if len(counts) > 1:
+        report["errors"].append(f"Shard runs disagree on the shard count: {sorted(counts)}")
+        return
+    if not counts:
         return
+    count = counts.pop()
+    indexes = Counter(m["shard"]["index"] for m in manifests)
+    missing_shards = sorted(set(range(count)) - set(indexes))
+    repeated_shards = sorted(i for i, n in indexes.items() if n > 1)
+    if missing_shards:
+        report["errors"].append(f"Missing shards: {missing_shards}")
+    if repeated_shards:
+        report["errors"].append(f"Shards given more than once: {repeated_shards}")
 
-    print("   Analyzing sentiment for all reviews...")
-    df[['sentiment', 'sentiment_score']] = df.apply(
-        lambda x: pd.Series(analyze_sentiment(x['review'], x['language'])), 
-        axis=1
+
+def _check_key_coverage(merged, input_df, report):
+    """The merged rows must hold each input review key exactly as often as the input."""
+    expected = Counter(review_keys(input_df))
+    actual = Counter(merged['review_key'])
+    missing_keys = expected - actual
+    duplicate_keys = actual - expected
+    report["total_rows"] = len(input_df)
+    report["merged_rows"] = len(merged)
+    report["missing_keys"] = sum(missing_keys.values())
+    report["duplicate_keys"] = sum(duplicate_keys.values())
+    if missing_keys:
+        report["errors"].append(f"{report['missing_keys']} reviews missing, e.g. {list(missing_keys)[:5]}")
+    if duplicate_keys:
+        report["errors"].append(f"{report['duplicate_keys']} reviews duplicated or unknown, e.g. {list(duplicate_keys)[:5]}")
+
+
+def merge_shards(run_refs, input_df):
+    """Combine shard runs into one analyzed DataFrame in input order.
+
+    Returns (merged_df, report). merged_df is None when coverage validation
+    fails (runs not found, shards missing or repeated, chunks incomplete,
+    keys missing or duplicated); the report says why.
+    """
+    report = {"merged_at": datetime.now().isoformat(timespec="seconds"), "shards": [], "errors": []}
+    manifests, frames = _read_shard_runs(run_refs, report)
+    _check_shard_set(manifests, report)
+    merged = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['review_key'])
+    _check_key_coverage(merged, input_df, report)
+
+    if report["errors"]:
+        report["status"] = "failed"
+        return None, report
+
+    # Restore the input row order so the output matches an unsharded run
+    order = pd.DataFrame({'review_key': review_keys(input_df)})
+    order['_occ'] = _occurrence(order['review_key'])
+    merged['_occ'] = _occurrence(merged['review_key'])
+    merged = order.merge(merged, on=['review_key', '_occ'], how='left')
+    report["status"] = "complete"
+    return merged.drop(columns=['review_key', '_occ']), report
+
+
+# ---------- DATABASE SINK ----------
+
+def _read_chunk_records(run_dir, index):
+    chunk = pd.read_csv(chunk_path(run_dir, index), dtype={'review_key': str})
+    chunk['themes'] = chunk['themes'].apply(ast.literal_eval)
+    return chunk.to_dict('records')
+
+
+def open_db_sink(run_dir, manifest, max_pending=4):
+    """Start a background PostgreSQL writer for this run.
+
+    Chunks committed to the database are recorded in the manifest's
+    db_loaded_chunks; on resume, checkpointed chunks that never reached the
+    database are queued again first. Each chunk is written under the batch
+    id "<run_id>/<index>", so one that was committed just before a crash
+    (but not yet recorded in the manifest) is not loaded twice.
+    """
+    sys.path.append(str(PROJECT_ROOT / "Database"))
+    from load_data import StreamingReviewWriter
+
+    manifest.setdefault("db_loaded_chunks", [])
+    writer = StreamingReviewWriter(
+        max_pending=max_pending,
+        on_committed=lambda index: mark_chunk(run_dir, manifest, "db_loaded_chunks", index),
     )
+    pending = sorted(set(manifest["completed_chunks"]) - set(manifest["db_loaded_chunks"]))
+    for index in pending:
+        writer.put(_read_chunk_records(run_dir, index), tag=index, batch_id=f"{manifest['run_id']}/{index}")
+    return writer
 
-    # 4. Thematic Analysis
-    print("\n🔍 Running thematic analysis...")
-    try:
-        nlp_en = spacy.load("en_core_web_sm")
-    except:
-        import spacy.cli
-        spacy.cli.download("en_core_web_sm")
-        nlp_en = spacy.load("en_core_web_sm")
 
-    print("   Identifying themes...")
-    df['themes'] = df.apply(lambda x: extract_themes(x['review'], x['language']), axis=1)
+# ---------- SPIKE MONITOR ----------
 
-    # 5. Save Results
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_filename = f"analyzed_reviews_{timestamp}.csv"
+def open_monitor(run_dir, manifest):
+    """Return (feed(index, records), finish()) for the sentiment spike monitor.
+
+    Chunks fed to the monitor are recorded in the manifest's
+    monitored_chunks; on resume, the other checkpointed chunks are fed first.
+    The monitor also remembers the run/chunk ids it has applied (saved with
+    its state), so a chunk replayed after a crash is not counted twice.
+    Chunks are fed without moving the monitor's watermark, so reviews of any
+    day in the run are kept whatever the chunk order; finish(), called once
+    every chunk is in, closes the days that are old enough.
+    """
+    sys.path.append(str(PROJECT_ROOT))
+    from scripts.sentiment_monitor import SentimentMonitor
+
+    monitor = SentimentMonitor()
+    manifest.setdefault("monitored_chunks", [])
+
+    def feed(index, records):
+        monitor.update(records, batch_id=f"{manifest['run_id']}/{index}", advance=False)
+        monitor.save()
+        mark_chunk(run_dir, manifest, "monitored_chunks", index)
+
+    def finish():
+        monitor.update([])
+        monitor.save()
+
+    for index in sorted(set(manifest["completed_chunks"]) - set(manifest["monitored_chunks"])):
+        feed(index, _read_chunk_records(run_dir, index))
+    return feed, finish
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run language, sentiment and theme analysis on cleaned reviews.")
+    parser.add_argument("--input", default=str(DATA_DIR / "clean_reviews.csv"),
+                        help="Cleaned reviews CSV to analyze")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Reviews per checkpointed chunk")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue an interrupted run from its last completed chunk")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N",
+                        help="Only analyze shard i of N (0-based), partitioned by review key")
+    parser.add_argument("--merge", nargs="+", metavar="RUN_ID",
+                        help="Merge completed shard runs (ids or run directories) into one analyzed file")
+    parser.add_argument("--db-sink", action="store_true",
+                        help="Stream each finished chunk into PostgreSQL while analysis continues")
+    parser.add_argument("--monitor", action="store_true",
+                        help="Feed each finished chunk to the sentiment spike monitor (scripts/sentiment_monitor.py)")
+    parser.add_argument("--no-csv", action="store_true",
+                        help="Skip writing the compacted analyzed_reviews_*.csv")
+    args = parser.parse_args(argv)
+    if args.monitor and args.shard:
+        # Shard processes would each overwrite the monitor's single state file
+        parser.error("--monitor cannot be combined with --shard; feed the merged file with "
+                     "scripts/sentiment_monitor.py --input instead")
+    return args
+
+
+def save_results(df, output_filename):
+    """Write the analyzed reviews to data/, falling back to the home directory."""
     output_path = DATA_DIR / output_filename
     
     print(f"\n💾 Saving results to: {output_path}")
     try:
-        df.to_csv(str(output_path), index=False)
+        _atomic_write(output_path, lambda f: df.to_csv(f, index=False))
         print(f"✅ Successfully saved analysis to: {output_path}")
+        return output_path
     except Exception as e:
         print(f"❌ Error saving to {output_path}: {str(e)}")
         home_path = Path.home() / output_filename
@@ -195,12 +522,136 @@ def main():
         try:
             df.to_csv(str(home_path), index=False)
             print(f"✅ Successfully saved to fallback location: {home_path}")
+            return home_path
         except Exception as e2:
             print(f"❌ Critical error: Could not save analysis results. Error: {str(e2)}")
             print("First 5 rows of analysis:")
             print(df.head().to_string())
+            return None
+
+
+def run_merge(args):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    input_path = Path(args.input)
+    print(f"Merging {len(args.merge)} shard runs against input: {input_path}")
+    df, report = merge_shards(args.merge, pd.read_csv(input_path))
+    report["input_path"] = str(input_path)
+    report["output_path"] = None
+    if df is not None:
+        output_path = save_results(df, f"analyzed_reviews_{timestamp}.csv")
+        report["output_path"] = str(output_path) if output_path else None
+
+    os.makedirs(RUNS_DIR, exist_ok=True)
+    report_path = RUNS_DIR / f"merge_report_{timestamp}.json"
+    _atomic_write(report_path, lambda f: json.dump(report, f, indent=2))
+    print(f"Merge report written to: {report_path}")
+    for error in report["errors"]:
+        print(f"❌ {error}")
+    return df, report
+
+
+def open_run(args, input_path, total_rows):
+    """Start a new run, or reopen the one given by --resume."""
+    if args.resume:
+        run_dir, manifest = resume_run(args.resume, input_path, total_rows, args.shard)
+        print(f"Resuming run {manifest['run_id']}: "
+              f"{len(manifest['completed_chunks'])}/{manifest['num_chunks']} chunks already done")
+    else:
+        run_dir, manifest = start_run(input_path, total_rows, args.chunk_size, shard=args.shard)
+        print(f"Started run {manifest['run_id']} ({manifest['num_chunks']} chunks) in {run_dir}")
+    return run_dir, manifest
+
+
+def run_chunks(df, run_dir, manifest, args):
+    """Analyze the outstanding chunks, feeding the --db-sink and --monitor consumers."""
+    writer = open_db_sink(run_dir, manifest) if args.db_sink else None
+    try:
+        monitor_feed, finish_monitor = open_monitor(run_dir, manifest) if args.monitor else (None, None)
+
+        def on_chunk(index, result):
+            records = result.to_dict('records')
+            if writer:
+                writer.put(records, tag=index, batch_id=f"{manifest['run_id']}/{index}")
+            if monitor_feed:
+                monitor_feed(index, records)
+
+        process_chunks(df, run_dir, manifest, on_chunk=on_chunk)
+        if finish_monitor:
+            finish_monitor()
+    finally:
+        if writer:
+            print("   Waiting for database writes to finish...")
+            writer.close()
+    if writer:
+        print(f"🗄️  Loaded {writer.rows_written} reviews into PostgreSQL")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.merge:
+        df, report = run_merge(args)
+        if report["status"] == "failed":
+            sys.exit(1)
+        print_summary(df)
+        return
+
+    print("Starting sentiment analysis...")
+    
+    # 1. Load data
+    input_path = Path(args.input)
+    print(f"Loading data from: {input_path}")
+    df = pd.read_csv(input_path)
+    print(f"Loaded {len(df)} reviews for analysis")
+    if args.shard:
+        df = select_shard(df, args.shard)
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: {len(df)} reviews")
+
+    run_dir, manifest = open_run(args, input_path, len(df))
+
+    # 2. Load models
+    print("\n🔍 Loading sentiment models...")
+    try:
+        _ensure_models_loaded()
+    except Exception:
+        return
+
+    try:
+        nlp_en = spacy.load("en_core_web_sm")
+    except OSError:
+        from spacy import cli as spacy_cli
+        spacy_cli.download("en_core_web_sm")
+        nlp_en = spacy.load("en_core_web_sm")
+
+    # 3. Language detection, sentiment and themes, one checkpointed chunk at a time
+    print("\n🌐 Analyzing languages, sentiment and themes...")
+    run_chunks(df, run_dir, manifest, args)
+
+    if args.shard or args.no_csv:
+        # Shard runs and --no-csv runs keep their output as the checkpointed
+        # chunks (shards are combined later with --merge)
+        manifest["status"] = "complete"
+        save_manifest(run_dir, manifest)
+        print(f"\n✅ Run {manifest['run_id']} complete: {run_dir}")
+        return
+
+    # 4. Compact the chunks into the final analyzed file
+    df = compact_run(run_dir, manifest)
+
+    # 5. Save Results
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_path = save_results(df, f"analyzed_reviews_{timestamp}.csv")
+    if output_path is None:
+        print(f"Chunk checkpoints are still available in: {run_dir}")
+
+    manifest["output_path"] = str(output_path) if output_path else None
+    manifest["status"] = "complete" if output_path else "compaction_failed"
+    save_manifest(run_dir, manifest)
+
+    print_summary(df)
+
 
-    # 6. Generate Summary Statistics
+def print_summary(df):
+    """Print language, sentiment and theme distributions of the analyzed reviews."""
     print("\n📊 Analysis Summary:")
     print(f"Total reviews analyzed: {len(df)}")
 
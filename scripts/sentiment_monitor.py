@@ -0,0 +1,473 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+
+# Set up paths
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scripts.analyzed_data import parse_themes, review_key
+
+load_dotenv()
+
+# Online anomaly monitor for newly analyzed reviews. For every bank it keeps
+# running statistics of the days still open (the last lateness_days before
+# today) and an EWMA baseline built from the days already closed, so memory
+# does not grow with history:
+#   - Welford mean/variance of the signed sentiment score (the model's
+#     sentiment_score is the confidence of the label, so NEGATIVE reviews
+#     count as -score and NEUTRAL ones as 0)
+#   - the share of NEGATIVE reviews
+#   - theme counts, and the share of negative reviews mentioning each theme
+#   - the keys (SHA-1 of bank, date and text) of its reviews, so a review
+#     fed again while its day is open (a re-scrape, a new run) counts once
+# A day is compared with the baseline as reviews arrive; spikes are appended
+# to alerts.jsonl. The state is a JSON file, so a restart continues where it
+# stopped without rescanning old reviews.
+
+MONITOR_DIR = PROJECT_ROOT / "data" / "monitor"
+STATE_PATH = MONITOR_DIR / "state.json"
+ALERTS_PATH = MONITOR_DIR / "alerts.jsonl"
+
+# Standard deviation floor for ratio metrics, so a perfectly flat baseline
+# does not turn a single review into an infinite z-score
+MIN_STD = 0.05
+
+# Ids of the most recent fed batches (run chunks) remembered for idempotent replays
+MAX_FED_BATCHES = 10000
+
+
+class RunningStats:
+    """Welford's online mean and variance."""
+
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n, self.mean, self.m2 = n, mean, m2
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    def to_dict(self):
+        return {"n": self.n, "mean": self.mean, "m2": self.m2}
+
+
+class Ewma:
+    """Exponentially weighted moving mean and variance of a daily value."""
+
+    def __init__(self, mean=None, var=0.0, days=0):
+        self.mean, self.var, self.days = mean, var, days
+
+    def update(self, x, alpha):
+        self.days += 1
+        if self.mean is None:
+            self.mean = x
+            return
+        delta = x - self.mean
+        self.mean += alpha * delta
+        self.var = (1 - alpha) * (self.var + alpha * delta * delta)
+
+    def zscore(self, x, min_std=0.0):
+        if self.mean is None:
+            return 0.0
+        return (x - self.mean) / max(math.sqrt(self.var), min_std)
+
+    def to_dict(self):
+        return {"mean": self.mean, "var": self.var, "days": self.days}
+
+
+class DayStats:
+    """Running statistics of one bank's reviews on one day."""
+
+    def __init__(self, score=None, negatives=0, themes=None, negative_themes=None, alerted=None, keys=None):
+        self.score = RunningStats(**(score or {}))
+        self.negatives = negatives
+        self.themes = themes or {}
+        self.negative_themes = negative_themes or {}
+        self.alerted = alerted or []
+        self.keys = set(keys or [])
+
+    @property
+    def n(self):
+        return self.score.n
+
+    @property
+    def negative_ratio(self):
+        return self.negatives / self.n if self.n else 0.0
+
+    def negative_share(self, theme):
+        return self.negative_themes.get(theme, 0) / self.negatives if self.negatives else 0.0
+
+    def add(self, sentiment, score, themes, key=None):
+        """Count a review; False (and not counted) if its key was already seen."""
+        if key is not None:
+            if key in self.keys:
+                return False
+            self.keys.add(key)
+        negative = sentiment == "NEGATIVE"
+        sign = {"POSITIVE": 1.0, "NEGATIVE": -1.0}.get(sentiment, 0.0)
+        self.score.add(sign * score)
+        self.negatives += negative
+        for theme in set(themes):
+            self.themes[theme] = self.themes.get(theme, 0) + 1
+            if negative:
+                self.negative_themes[theme] = self.negative_themes.get(theme, 0) + 1
+        return True
+
+    def to_dict(self):
+        return {"score": self.score.to_dict(), "negatives": self.negatives, "themes": self.themes,
+                "negative_themes": self.negative_themes, "alerted": self.alerted, "keys": sorted(self.keys)}
+
+
+class Baseline:
+    """EWMA baselines of a bank's daily metrics, built from closed days."""
+
+    def __init__(self, score=None, negative_ratio=None, negative_themes=None):
+        self.score = Ewma(**(score or {}))
+        self.negative_ratio = Ewma(**(negative_ratio or {}))
+        self.negative_themes = {theme: Ewma(**e) for theme, e in (negative_themes or {}).items()}
+
+    @property
+    def days(self):
+        return self.score.days
+
+    def fold(self, day, alpha):
+        self.score.update(day.score.mean, alpha)
+        self.negative_ratio.update(day.negative_ratio, alpha)
+        if day.negatives:
+            for theme in set(self.negative_themes) | set(day.negative_themes):
+                self.negative_themes.setdefault(theme, Ewma(mean=0.0)).update(day.negative_share(theme), alpha)
+
+    def to_dict(self):
+        return {"score": self.score.to_dict(), "negative_ratio": self.negative_ratio.to_dict(),
+                "negative_themes": {theme: e.to_dict() for theme, e in self.negative_themes.items()}}
+
+
+def _day_key(value):
+    """'YYYY-MM-DD' for a date, Timestamp or date string."""
+    return str(value)[:10]
+
+
+class SentimentMonitor:
+    """Flags per-bank daily sentiment spikes against an EWMA baseline.
+
+    update() takes analyzed-review records (bank, date, review, sentiment,
+    sentiment_score, themes) as they arrive, in any order. Days stay open
+    until they fall behind the watermark, lateness_days before today; they
+    are then checked a last time and folded into the baseline. Reviews for
+    days already behind the watermark are counted as late and skipped with
+    a warning, and a review whose key was already counted on its open day
+    is skipped as a duplicate. History is fed through backfill(), which
+    replays date-sorted reviews one day at a time, or through update(...,
+    advance=False) followed by one update([]) once the whole batch is in.
+    An open day is checked once it has min_reviews reviews and the baseline
+    has warmup_days days. Every alert is written to the alerts sink once per
+    bank, day and metric.
+
+    The state file has a single writer: each instance saves its whole
+    in-memory state, so two processes sharing a state file lose each
+    other's updates.
+    """
+
+    def __init__(self, state_path=None, alerts_path=None, alpha=0.2, threshold=3.0,
+                 min_reviews=5, min_delta=0.1, warmup_days=7, lateness_days=3):
+        self.state_path = Path(state_path or STATE_PATH)
+        self.alerts_path = Path(alerts_path or ALERTS_PATH)
+        self.alpha = alpha
+        self.threshold = threshold
+        self.min_reviews = min_reviews
+        self.min_delta = min_delta
+        self.warmup_days = warmup_days
+        self.lateness_days = lateness_days
+        self.banks = {}
+        self.watermark = None  # 'YYYY-MM-DD'; days up to and including it are closed
+        self.fed_batches = []
+        self.late_reviews = 0
+        self.duplicate_reviews = 0
+        self.db_last_review_id = 0
+        if self.state_path.exists():
+            self._load()
+
+    # ----- persistence -----
+
+    def _load(self):
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        self.watermark = state.get("watermark")
+        self.fed_batches = state.get("fed_batches", [])
+        self.late_reviews = state.get("late_reviews", 0)
+        self.duplicate_reviews = state.get("duplicate_reviews", 0)
+        self.db_last_review_id = state.get("db_last_review_id", 0)
+        for bank, bank_state in state["banks"].items():
+            self.banks[bank] = {
+                "days": {day: DayStats(**stats) for day, stats in bank_state["days"].items()},
+                "baseline": Baseline(**bank_state["baseline"]),
+            }
+
+    def save(self):
+        """Write the state atomically (per-process temporary file renamed into place)."""
+        state = {
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "watermark": self.watermark,
+            "fed_batches": self.fed_batches,
+            "late_reviews": self.late_reviews,
+            "duplicate_reviews": self.duplicate_reviews,
+            "db_last_review_id": self.db_last_review_id,
+            "banks": {
+                bank: {
+                    "days": {day: stats.to_dict() for day, stats in b["days"].items()},
+                    "baseline": b["baseline"].to_dict(),
+                }
+                for bank, b in self.banks.items()
+            },
+        }
+        os.makedirs(self.state_path.parent, exist_ok=True)
+        tmp_path = self.state_path.with_name(f"{self.state_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_path)
+
+    # ----- streaming updates -----
+
+    def update(self, records, today=None, batch_id=None, advance=True):
+        """Fold a batch of analyzed reviews in; returns the alerts it raised.
+
+        today (default: the current date) moves the watermark forward. With
+        advance=False the watermark stays put and no day is closed, so the
+        chunks of one analysis run can arrive in any order and sizes; the
+        run's end then calls update([]). A batch_id that was already fed,
+        such as a resumed run's chunk, is skipped. The ids are saved with
+        the state, so a replay after a crash cannot count the batch twice
+        (alerts written just before the crash may be written again).
+        """
+        if batch_id is not None:
+            if batch_id in self.fed_batches:
+                return []
+            self.fed_batches = (self.fed_batches + [batch_id])[-MAX_FED_BATCHES:]
+        late_before = self.late_reviews
+        alerts = self._apply(records, (today or date.today()) if advance else None)
+        self._warn_late(self.late_reviews - late_before)
+        return alerts
+
+    def backfill(self, df):
+        """Replay historical reviews in date order, each day as if it were today."""
+        df = df[df["date"].notna()]
+        late_before = self.late_reviews
+        alerts = []
+        for day, group in df.groupby(df["date"].map(_day_key), sort=True):
+            alerts += self._apply(group.to_dict("records"), date.fromisoformat(day))
+        self._warn_late(self.late_reviews - late_before)
+        return alerts
+
+    def _apply(self, records, today):
+        touched = self._ingest(records)
+        alerts = self._advance(today, touched)
+        self._emit(alerts)
+        return alerts
+
+    def _warn_late(self, late):
+        if late:
+            print(f"⚠️  Skipped {late} review(s) dated on or before {self.watermark}, whose days are "
+                  "already closed (re-fed reviews were counted then; to add missing history, "
+                  "backfill it into a fresh state with --input)")
+
+    def _ingest(self, records):
+        """Add records to their open days; returns the touched (bank, day) pairs.
+
+        Reviews without text carry no key and are always counted.
+        """
+        touched = set()
+        for record in records:
+            if pd.isna(record.get("date")):
+                continue
+            bank, day = record["bank"], _day_key(record["date"])
+            if self.watermark is not None and day <= self.watermark:
+                self.late_reviews += 1
+                continue
+            text = record.get("review")
+            b = self.banks.setdefault(bank, {"days": {}, "baseline": Baseline()})
+            score = record.get("sentiment_score")
+            added = b["days"].setdefault(day, DayStats()).add(
+                str(record.get("sentiment", "")).upper(),
+                0.0 if pd.isna(score) else float(score),
+                parse_themes(record.get("themes")),
+                review_key(bank, day, text) if isinstance(text, str) else None,
+            )
+            if not added:
+                self.duplicate_reviews += 1
+                continue
+            touched.add((bank, day))
+        return touched
+
+    def _advance(self, today, touched):
+        """Move the watermark up to today (if given), closing the days it passes, and check touched days."""
+        if today is not None:
+            watermark = (today - timedelta(days=self.lateness_days)).isoformat()
+            if self.watermark is None or watermark > self.watermark:
+                self.watermark = watermark
+        alerts = []
+        for bank in sorted(self.banks):
+            b = self.banks[bank]
+            for day in sorted(b["days"]):
+                stats = b["days"][day]
+                closing = self.watermark is not None and day <= self.watermark
+                if closing or (bank, day) in touched:
+                    alerts += self._check(bank, day, stats, b["baseline"])
+                if closing:
+                    b["baseline"].fold(stats, self.alpha)
+                    del b["days"][day]
+        return alerts
+
+    def _check(self, bank, day, stats, baseline):
+        if stats.n < self.min_reviews or baseline.days < self.warmup_days:
+            return []
+        candidates = []
+
+        ratio = stats.negative_ratio
+        z = baseline.negative_ratio.zscore(ratio, MIN_STD)
+        if z >= self.threshold and ratio - baseline.negative_ratio.mean >= self.min_delta:
+            candidates.append(("negative_ratio", None, ratio, baseline.negative_ratio, z))
+
+        z = baseline.score.zscore(stats.score.mean, MIN_STD)
+        if z <= -self.threshold and baseline.score.mean - stats.score.mean >= self.min_delta:
+            candidates.append(("sentiment_drop", None, stats.score.mean, baseline.score, z))
+
+        if stats.negatives >= self.min_reviews:
+            for theme in sorted(stats.negative_themes):
+                share = stats.negative_share(theme)
+                ewma = baseline.negative_themes.get(theme, Ewma(mean=0.0))
+                z = ewma.zscore(share, MIN_STD)
+                if z >= self.threshold and share - ewma.mean >= self.min_delta:
+                    candidates.append(("negative_theme", theme, share, ewma, z))
+
+        alerts = []
+        for kind, theme, value, ewma, z in candidates:
+            key = f"{kind}:{theme}" if theme else kind
+            if key in stats.alerted:
+                continue
+            stats.alerted.append(key)
+            alerts.append({
+                "type": kind, "bank": bank, "day": day, "theme": theme,
+                "value": round(value, 4), "baseline": round(ewma.mean, 4), "zscore": round(z, 2),
+                "reviews": stats.n, "negatives": stats.negatives,
+                "score_mean": round(stats.score.mean, 4), "score_std": round(math.sqrt(stats.score.variance), 4),
+                "detected_at": datetime.now().isoformat(timespec="seconds"),
+            })
+        return alerts
+
+    def _emit(self, alerts):
+        if not alerts:
+            return
+        os.makedirs(self.alerts_path.parent, exist_ok=True)
+        with open(self.alerts_path, "a", encoding="utf-8") as f:
+            for alert in alerts:
+                f.write(json.dumps(alert, ensure_ascii=False) + "\n")
+        for alert in alerts:
+            subject = f"'{alert['theme']}' in negative reviews" if alert["theme"] else alert["type"]
+            print(f"🚨 {alert['bank']} {alert['day']}: {subject} at {alert['value']:.2f} "
+                  f"(baseline {alert['baseline']:.2f}, z={alert['zscore']}, {alert['reviews']} reviews)")
+
+
+# ---------- DATABASE SOURCE ----------
+
+def get_db_connection():
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME", "bank_reviews"),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASSWORD", ""),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=os.getenv("DB_PORT", "5432")
+    )
+
+
+def poll_db(conn, monitor, batch_size=1000):
+    """Feed reviews loaded since the last poll (by review_id) to the monitor.
+
+    Saves the state after every batch; returns the number of reviews read.
+    Assumes a single loader: ids are assigned at insert, so rows of a
+    transaction that commits after a higher id was already polled are missed.
+    """
+    total = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT r.review_id, b.bank_name, r.review_date, r.review_text, r.sentiment_label,
+                       r.sentiment_score, r.themes
+                FROM reviews r
+                JOIN banks b ON r.bank_id = b.bank_id
+                WHERE r.review_id > %s
+                ORDER BY r.review_id
+                LIMIT %s
+            """, (monitor.db_last_review_id, batch_size))
+            rows = cur.fetchall()
+        conn.rollback()  # end the read transaction between polls
+        if not rows:
+            return total
+        monitor.update(
+            {"bank": bank, "date": day, "review": text, "sentiment": sentiment, "sentiment_score": score,
+             "themes": themes or []}
+            for _, bank, day, text, sentiment, score, themes in rows
+        )
+        monitor.db_last_review_id = rows[-1][0]
+        monitor.save()
+        total += len(rows)
+
+
+# ---------- CLI ----------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flag daily sentiment spikes per bank.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="Analyzed reviews CSV to backfill in date order (builds the baseline)")
+    source.add_argument("--db", action="store_true", help="Feed reviews loaded into PostgreSQL since the last poll")
+    parser.add_argument("--follow", type=int, metavar="SECONDS",
+                        help="With --db, keep polling at this interval")
+    parser.add_argument("--state", default=str(STATE_PATH), help="Monitor state file")
+    parser.add_argument("--alerts", default=str(ALERTS_PATH), help="Alerts JSON-lines file")
+    parser.add_argument("--threshold", type=float, default=3.0, help="z-score that counts as a spike")
+    parser.add_argument("--min-reviews", type=int, default=5, help="Reviews needed before a day is checked")
+    args = parser.parse_args(argv)
+
+    monitor = SentimentMonitor(args.state, args.alerts, threshold=args.threshold, min_reviews=args.min_reviews)
+    if args.input:
+        df = pd.read_csv(args.input)
+        alerts = monitor.backfill(df)
+        monitor.save()
+        print(f"Fed {len(df)} reviews, {len(alerts)} alerts; state saved to {args.state}")
+    else:
+        conn = get_db_connection()
+        try:
+            while True:
+                count = poll_db(conn, monitor)
+                print(f"Fed {count} new reviews (last review_id {monitor.db_last_review_id})")
+                if not args.follow:
+                    break
+                time.sleep(args.follow)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            conn.close()
+    if monitor.late_reviews:
+        print(f"{monitor.late_reviews} reviews arrived after their day was closed and were skipped")
+    if monitor.duplicate_reviews:
+        print(f"{monitor.duplicate_reviews} reviews had already been counted and were skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import os
+import sys
+import argparse
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import vstack
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, HashingVectorizer
+from sklearn.preprocessing import normalize
+
+# Set up paths
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scripts.analyzed_data import get_latest_analyzed_file
+
+# Candidate themes beyond the keyword lists in sentiment_analysis.extract_themes.
+# Reviews are hashed (no vocabulary held in memory), TF-IDF weighted and
+# clustered with MiniBatchKMeans, streaming the CSV in chunks; memory is
+# bounded by the chunk size and the number of hash features, not the input.
+# Each cluster is reported with its top terms, its share per bank/sentiment
+# and how many of its reviews the keyword rules currently label 'Other'.
+
+DATA_DIR = os.path.join("data")
+
+# Words that appear in nearly every review and say nothing about the theme
+DOMAIN_STOP_WORDS = {"app", "apps", "application", "bank", "banking", "cbe", "boa", "dashen", "mobile"}
+
+# Candidate terms counted per hash feature when naming top features
+TERM_CANDIDATES = 16
+
+
+def make_vectorizer(n_features: int = 2 ** 18) -> HashingVectorizer:
+    """Stateless unigram+bigram term counter (Amharic words are \\w tokens too)."""
+    return HashingVectorizer(
+        n_features=n_features,
+        ngram_range=(1, 2),
+        stop_words=sorted(ENGLISH_STOP_WORDS | DOMAIN_STOP_WORDS),
+        alternate_sign=False,
+        norm=None,
+    )
+
+
+def iter_chunks(csv_path: str, chunk_size: int):
+    """Stream the analyzed CSV in chunks with a clean review column."""
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        chunk["review"] = chunk["review"].fillna("").astype(str)
+        yield chunk
+
+
+def _tfidf(vectorizer, idf, texts):
+    counts = vectorizer.transform(texts)
+    return normalize(counts.multiply(idf).tocsr())
+
+
+def fit_idf(csv_path: str, vectorizer: HashingVectorizer, chunk_size: int) -> np.ndarray:
+    """First pass: smoothed IDF weights per hash feature (as in TfidfTransformer)."""
+    doc_freq = np.zeros(vectorizer.n_features, dtype=np.int64)
+    n_docs = 0
+    for chunk in iter_chunks(csv_path, chunk_size):
+        counts = vectorizer.transform(chunk["review"])
+        doc_freq += np.bincount(counts.indices, minlength=vectorizer.n_features)
+        n_docs += counts.shape[0]
+    return np.log((1 + n_docs) / (1 + doc_freq)) + 1
+
+
+def fit_clusters(csv_path, vectorizer, idf, n_clusters, chunk_size, random_state=0):
+    """Second pass: incremental MiniBatchKMeans over the TF-IDF chunks."""
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state,
+                             batch_size=min(chunk_size, 4096), n_init=3)
+    pending = None
+    for chunk in iter_chunks(csv_path, chunk_size):
+        X = _tfidf(vectorizer, idf, chunk["review"])
+        # partial_fit needs at least n_clusters rows; carry small tails over
+        if pending is not None:
+            X = vstack([pending, X]).tocsr()
+            pending = None
+        if X.shape[0] < n_clusters:
+            pending = X
+            continue
+        kmeans.partial_fit(X)
+    if pending is not None:
+        if not hasattr(kmeans, "cluster_centers_"):
+            raise ValueError(f"Need at least {n_clusters} reviews to find {n_clusters} themes")
+        kmeans.partial_fit(pending)
+    return kmeans
+
+
+def assign_clusters(csv_path, vectorizer, idf, kmeans, chunk_size) -> pd.DataFrame:
+    """Third pass: review counts per (bank, sentiment, cluster), with 'Other' counts."""
+    totals = {}
+    for chunk in iter_chunks(csv_path, chunk_size):
+        chunk["cluster"] = kmeans.predict(_tfidf(vectorizer, idf, chunk["review"]))
+        chunk["is_other"] = chunk["themes"].astype(str).str.contains("'Other'", regex=False)
+        grouped = chunk.groupby(["bank", "sentiment", "cluster"]).agg(
+            count=("review", "size"), other_count=("is_other", "sum")
+        )
+        for key, row in grouped.iterrows():
+            count, other = totals.get(key, (0, 0))
+            totals[key] = (count + int(row["count"]), other + int(row["other_count"]))
+
+    rows = [(*key, count, other) for key, (count, other) in totals.items()]
+    return pd.DataFrame(rows, columns=["bank", "sentiment", "cluster", "count", "other_count"])
+
+
+def _count_candidate(counter, term, count, capacity):
+    """Space-saving update: once the counter is full, a new term replaces the
+    least frequent one and inherits its count, so frequent terms survive."""
+    if term not in counter and len(counter) >= capacity:
+        counter[term] = counter.pop(min(counter, key=counter.get))
+    counter[term] = counter.get(term, 0) + count
+
+
+def resolve_terms(csv_path, vectorizer, wanted, chunk_size, capacity=TERM_CANDIDATES) -> dict:
+    """Map hash feature indexes back to readable terms by re-hashing seen terms.
+
+    Several terms can share a hash feature, so each wanted index is named
+    after the most frequent term seen for it, counted with a bounded
+    (space-saving) counter of at most `capacity` candidates per index.
+    """
+    term_hasher = HashingVectorizer(n_features=vectorizer.n_features, analyzer=lambda term: [term],
+                                    alternate_sign=False, norm=None)
+    analyzer = vectorizer.build_analyzer()
+    candidates = {index: {} for index in wanted}
+    for chunk in iter_chunks(csv_path, chunk_size):
+        counts = Counter(term for text in chunk["review"] for term in analyzer(text))
+        if not counts:
+            continue
+        seen = sorted(counts)
+        indexes = term_hasher.transform(seen).indices
+        for term, index in zip(seen, indexes):
+            if index in candidates:
+                _count_candidate(candidates[index], term, counts[term], capacity)
+    return {index: max(sorted(counter), key=counter.get) for index, counter in candidates.items() if counter}
+
+
+def discover_themes(csv_path: str, n_clusters: int = 12, n_terms: int = 8,
+                    chunk_size: int = 5000, n_features: int = 2 ** 18, random_state: int = 0):
+    """Return (themes, themes_by_bank) DataFrames of candidate themes."""
+    vectorizer = make_vectorizer(n_features)
+    idf = fit_idf(csv_path, vectorizer, chunk_size)
+    kmeans = fit_clusters(csv_path, vectorizer, idf, n_clusters, chunk_size, random_state)
+    by_bank = assign_clusters(csv_path, vectorizer, idf, kmeans, chunk_size)
+
+    top_indexes = np.argsort(kmeans.cluster_centers_, axis=1)[:, ::-1][:, :n_terms]
+    top_weights = np.take_along_axis(kmeans.cluster_centers_, top_indexes, axis=1)
+    terms = resolve_terms(csv_path, vectorizer,
+                          {int(i) for i, w in zip(top_indexes.ravel(), top_weights.ravel()) if w > 0},
+                          chunk_size)
+    top_terms = [
+        ", ".join(terms.get(int(i), f"#{i}") for i, w in zip(indexes, weights) if w > 0)
+        for indexes, weights in zip(top_indexes, top_weights)
+    ]
+
+    sizes = by_bank.groupby("cluster")[["count", "other_count"]].sum()
+    themes = pd.DataFrame({"cluster": range(n_clusters), "top_terms": top_terms})
+    themes = themes.join(sizes, on="cluster").fillna(0)
+    themes[["count", "other_count"]] = themes[["count", "other_count"]].astype(int)
+    themes["other_share"] = (themes["other_count"] / themes["count"].where(themes["count"] > 0)).round(3)
+    themes = themes.sort_values("count", ascending=False).reset_index(drop=True)
+
+    group_totals = by_bank.groupby(["bank", "sentiment"])["count"].transform("sum")
+    by_bank["share"] = (by_bank["count"] / group_totals).round(3)
+    by_bank = by_bank.merge(themes[["cluster", "top_terms"]], on="cluster")
+    by_bank = by_bank.sort_values(["bank", "sentiment", "count"], ascending=[True, True, False])
+    return themes, by_bank.reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Discover candidate review themes by clustering.")
+    parser.add_argument("--input", help="Analyzed reviews CSV (default: latest in data/)")
+    parser.add_argument("--clusters", type=int, default=12, help="Number of candidate themes")
+    parser.add_argument("--terms", type=int, default=8, help="Top terms shown per theme")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Reviews per streamed chunk")
+    args = parser.parse_args(argv)
+
+    csv_path = args.input or get_latest_analyzed_file()
+    print(f"Discovering themes in: {csv_path}")
+    themes, by_bank = discover_themes(csv_path, n_clusters=args.clusters,
+                                      n_terms=args.terms, chunk_size=args.chunk_size)
+
+    print("\n=== Candidate themes ===")
+    print(themes.to_string(index=False))
+
+    print("\n=== Top candidate themes per bank and sentiment ===")
+    top = by_bank.groupby(["bank", "sentiment"]).head(3)
+    print(top[["bank", "sentiment", "cluster", "count", "share", "top_terms"]].to_string(index=False))
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    themes_path = os.path.join(DATA_DIR, f"theme_candidates_{timestamp}.csv")
+    by_bank_path = os.path.join(DATA_DIR, f"theme_candidates_by_bank_{timestamp}.csv")
+    themes.to_csv(themes_path, index=False)
+    by_bank.to_csv(by_bank_path, index=False)
+    print(f"\nSaved: {themes_path}")
+    print(f"Saved: {by_bank_path}")
+
+
+if __name__ == "__main__":
+    main()
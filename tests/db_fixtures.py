@@ -0,0 +1,48 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import psycopg2
+
+# Add the project root (and the Database scripts) to the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "Database"))
+
+import database_setup
+
+TEST_DB = "bank_reviews_test"
+
+
+class ScratchDatabaseTestCase(unittest.TestCase):
+    """Creates a throwaway bank_reviews_test database with the project schema.
+
+    DB_NAME points at it for the duration of the class. Skipped when no
+    PostgreSQL server is reachable with the usual DB_* settings.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            admin = psycopg2.connect(dbname="postgres", user=os.getenv("DB_USER", "postgres"),
+                                     host=os.getenv("DB_HOST", "localhost"),
+                                     port=os.getenv("DB_PORT", "5432"))
+        except psycopg2.OperationalError as e:
+            raise unittest.SkipTest(f"PostgreSQL not available: {e}")
+        admin.autocommit = True
+        cls.admin = admin
+        with admin.cursor() as cur:
+            cur.execute(f'DROP DATABASE IF EXISTS "{TEST_DB}"')
+
+        cls.env = patch.dict(os.environ, {"DB_NAME": TEST_DB})
+        cls.env.start()
+        database_setup.create_database()
+        database_setup.create_tables()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.env.stop()
+        with cls.admin.cursor() as cur:
+            cur.execute(f'DROP DATABASE IF EXISTS "{TEST_DB}" WITH (FORCE)')
+        cls.admin.close()
@@ -0,0 +1,107 @@
+import unittest
+
+import pandas as pd
+
+from db_fixtures import ScratchDatabaseTestCase
+import load_data
+import rollup
+from scripts.insights_task4 import CsvInsightsBackend, DbInsightsBackend, get_db_connection
+
+
+def make_reviews():
+    df = pd.DataFrame({
+        "review": ["fast app", "transfer failed", "crash", "great", "slow", "ok"],
+        "rating": [5, 1, 2, 5, 2, 3],
+        "date": pd.to_datetime(["2025-01-03", "2025-01-20", "2025-02-11",
+                                "2025-02-14", "2025-03-01", "2025-03-30"]),
+        "bank": ["CBE", "CBE", "CBE", "BOA", "BOA", "BOA"],
+        "sentiment": ["POSITIVE", "NEGATIVE", "NEGATIVE", "POSITIVE", "NEGATIVE", "POSITIVE"],
+        "sentiment_score": [0.9, 0.8, 0.7, 0.95, 0.6, 0.5],
+        "themes": [["App Performance"], ["Transaction Issues"],
+                   ["App Performance", "Transaction Issues"], ["Other"],
+                   ["App Performance"], ["Other"]],
+    })
+    return df
+
+
+class TestCsvInsightsBackend(unittest.TestCase):
+    def setUp(self):
+        self.backend = CsvInsightsBackend(make_reviews())
+
+    def test_bank_metrics_sorted_by_count_then_bank(self):
+        metrics = self.backend.bank_metrics()
+        self.assertEqual(metrics["bank"].tolist(), ["BOA", "CBE"])
+        self.assertEqual(metrics["review_count"].tolist(), [3, 3])
+
+    def test_top_themes_breaks_ties_alphabetically(self):
+        self.assertEqual(self.backend.top_themes("CBE", sentiment="negative"),
+                         [("Transaction Issues", 2), ("App Performance", 1)])
+        self.assertEqual(self.backend.top_themes("CBE", n=1), [("App Performance", 2)])
+
+    def test_sentiment_trend_is_monthly_mean(self):
+        trend = self.backend.sentiment_trend("BOA")
+        self.assertEqual(list(trend.index.month), [2, 3])
+        self.assertAlmostEqual(trend.iloc[1], 0.55)
+
+
+class TestDbInsightsBackend(ScratchDatabaseTestCase):
+    """Compares the SQL aggregations with the pandas ones on a local PostgreSQL.
+
+    Uses a scratch database created through database_setup and filled through
+    the loader, so the rollup tables are exercised too.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        df = make_reviews()
+        cls.conn = get_db_connection()
+        for bank in df["bank"].unique():
+            bank_id = load_data.insert_bank_data(cls.conn, bank)
+            records = df[df["bank"] == bank].to_dict("records")
+            for record in records:
+                record["date"] = record["date"].date()
+            # Two batches so the rollup upsert path is hit
+            load_data.insert_reviews_batch(cls.conn, bank_id, records[:1])
+            load_data.insert_reviews_batch(cls.conn, bank_id, records[1:])
+
+        cls.csv = CsvInsightsBackend(df)
+        cls.db = DbInsightsBackend(cls.conn)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+        super().tearDownClass()
+
+    def test_outputs_match_csv_backend(self):
+        pd.testing.assert_frame_equal(self.db.bank_metrics(), self.csv.bank_metrics())
+        pd.testing.assert_frame_equal(self.db.sentiment_counts(), self.csv.sentiment_counts())
+        pd.testing.assert_frame_equal(self.db.rating_counts(), self.csv.rating_counts())
+        for bank in ["CBE", "BOA"]:
+            for sentiment in [None, "POSITIVE", "negative"]:
+                self.assertEqual(self.db.top_themes(bank, sentiment), self.csv.top_themes(bank, sentiment))
+
+    def test_rollup_trends_match_raw_reviews(self):
+        for bank in ["CBE", "BOA"]:
+            for granularity in ["day", "week", "month"]:
+                pd.testing.assert_series_equal(self.db.sentiment_trend(bank, granularity),
+                                               self.csv.sentiment_trend(bank, granularity))
+
+    def test_rebuild_reproduces_incremental_rollup(self):
+        query = "SELECT * FROM review_daily_rollup ORDER BY 1, 2, 3, 4"
+        theme_query = "SELECT * FROM review_daily_theme_rollup ORDER BY 1, 2, 3, 4, 5"
+        with self.conn.cursor() as cur:
+            cur.execute(query)
+            before = cur.fetchall()
+            cur.execute(theme_query)
+            themes_before = cur.fetchall()
+        rollup.rebuild_daily_rollup(self.conn)
+        with self.conn.cursor() as cur:
+            cur.execute(query)
+            self.assertEqual(cur.fetchall(), before)
+            cur.execute(theme_query)
+            self.assertEqual(cur.fetchall(), themes_before)
+
+
+if __name__ == '__main__':
+    unittest.main()
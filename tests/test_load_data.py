@@ -0,0 +1,148 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+from db_fixtures import PROJECT_ROOT, ScratchDatabaseTestCase
+import load_data
+
+
+class TestReviewRow(unittest.TestCase):
+    def themes(self, value):
+        return load_data._review_row(1, {'themes': value})[-1]
+
+    def test_themes_are_parsed_like_the_insights(self):
+        self.assertEqual(self.themes("['Transaction Issues', 'Fees & Charges']"),
+                         ['Transaction Issues', 'Fees & Charges'])
+        self.assertEqual(self.themes(float('nan')), [])
+        self.assertEqual(self.themes("[]"), [])
+
+    def test_malformed_themes_fit_the_rollup_column(self):
+        themes = self.themes("[" + "x" * 300)
+        self.assertEqual(len(themes), 1)
+        self.assertEqual(len(themes[0]), load_data.THEME_MAX_LENGTH)
+
+    def test_import_has_no_plotting_side_effects(self):
+        with tempfile.TemporaryDirectory() as cwd:
+            code = ("import sys; sys.path.append(sys.argv[1]); import load_data; "
+                    "print('matplotlib' in sys.modules)")
+            out = subprocess.run([sys.executable, "-c", code, os.path.join(PROJECT_ROOT, "Database")],
+                                 cwd=cwd, capture_output=True, text=True, check=True).stdout
+            self.assertEqual(out.strip(), "False")
+            self.assertEqual(os.listdir(cwd), [])
+
+
+class TestStreamingReviewWriterErrors(unittest.TestCase):
+    def test_connection_failure_is_raised_to_the_producer(self):
+        def refuse():
+            raise ConnectionError("database down")
+
+        writer = load_data.StreamingReviewWriter(max_pending=1, connect=refuse)
+        with self.assertRaises(ConnectionError):
+            for _ in range(10):
+                writer.put([{'bank': 'CBE', 'review': 'x'}])
+        with self.assertRaises(ConnectionError):
+            writer.close()
+
+
+class TestStreamingReviewWriter(ScratchDatabaseTestCase):
+    def setUp(self):
+        conn = load_data.get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE reviews, review_daily_rollup, review_daily_theme_rollup, loaded_batches")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def test_batches_are_written_and_rolled_up(self):
+        committed = []
+        writer = load_data.StreamingReviewWriter(max_pending=2, on_committed=committed.append)
+        batches = [
+            [{'bank': 'CBE', 'review': 'fast', 'rating': 5, 'date': '2025-11-01',
+              'sentiment': 'POSITIVE', 'sentiment_score': 0.9, 'language': 'en', 'themes': ['App Performance']},
+             {'bank': 'BOA', 'review': 'slow', 'rating': 1, 'date': '2025-11-01',
+              'sentiment': 'NEGATIVE', 'sentiment_score': 0.8, 'language': 'en', 'themes': "['App Performance']"}],
+            [{'bank': 'CBE', 'review': 'ok', 'rating': 3, 'date': '2025-11-02',
+              'sentiment': 'POSITIVE', 'sentiment_score': float('nan'), 'language': 'en', 'themes': ['Other']}],
+        ]
+        for tag, batch in enumerate(batches):
+            writer.put(batch, tag=tag)
+        writer.close()
+
+        self.assertEqual(committed, [0, 1])
+        self.assertEqual(writer.rows_written, 3)
+        conn = load_data.get_db_connection()
+        try:
+            reviews = pd.DataFrame(self.fetch(conn, """
+                SELECT b.bank_name, r.review_text, r.sentiment_score, r.themes
+                FROM reviews r JOIN banks b USING (bank_id) ORDER BY r.review_id"""))
+            self.assertEqual(reviews[0].tolist(), ['CBE', 'BOA', 'CBE'])
+            self.assertTrue(pd.isna(reviews[2].iloc[2]))
+            self.assertEqual(reviews[3].iloc[1], ['App Performance'])
+            rollup_rows = self.fetch(conn, "SELECT SUM(review_count), SUM(score_count) FROM review_daily_rollup")
+            self.assertEqual(rollup_rows[0], (3, 2))
+        finally:
+            conn.close()
+
+    def test_bad_row_does_not_stop_the_writer(self):
+        batch = [{'bank': 'Dashen', 'review': f'ok {i}', 'date': '2025-11-06', 'sentiment': 'POSITIVE',
+                  'sentiment_score': 0.9, 'themes': ['Other']} for i in range(4)]
+        batch[1]['review'] = 'bad \x00 byte'
+        committed = []
+        writer = load_data.StreamingReviewWriter(on_committed=committed.append)
+        writer.put(batch, tag=0)
+        writer.close()
+        self.assertEqual((committed, writer.rows_written), ([0], 3))
+        conn = load_data.get_db_connection()
+        try:
+            rows = self.fetch(conn, "SELECT SUM(review_count) FROM review_daily_rollup WHERE day = '2025-11-06'")
+            self.assertEqual(rows[0][0], 3)
+        finally:
+            conn.close()
+
+    def test_replayed_batch_is_loaded_once(self):
+        batch = [{'bank': 'CBE', 'review': 'again', 'date': '2025-11-07', 'sentiment': 'POSITIVE',
+                  'sentiment_score': 0.9, 'themes': ['Other']}]
+        committed = []
+        # A crash after the commit but before on_committed: the resumed run queues the chunk again
+        for _ in range(2):
+            writer = load_data.StreamingReviewWriter(on_committed=committed.append)
+            writer.put(batch, tag=3, batch_id="run-a/3")
+            writer.close()
+        self.assertEqual((committed, writer.rows_written), ([3, 3], 0))
+        conn = load_data.get_db_connection()
+        try:
+            rows = self.fetch(conn, "SELECT COUNT(*) FROM reviews WHERE review_text = 'again'")
+            self.assertEqual(rows[0][0], 1)
+        finally:
+            conn.close()
+
+    def test_row_by_row_fallback_skips_only_bad_rows(self):
+        conn = load_data.get_db_connection()
+        try:
+            bank_id = load_data.insert_bank_data(conn, 'Dashen')
+            batch = [{'review': f'ok {i}', 'date': '2025-11-05', 'sentiment': 'POSITIVE',
+                      'sentiment_score': 0.9, 'themes': ['Other']} for i in range(5)]
+            batch[2]['review'] = 'bad \x00 byte'   # rejected by the driver
+            batch[4]['rating'] = 2 ** 40           # rejected by the server
+            with self.assertRaises(Exception):
+                load_data.insert_reviews_batch(conn, bank_id, batch)
+            self.assertEqual(load_data.insert_reviews_row_by_row(conn, bank_id, batch), 3)
+            rows = self.fetch(conn, f"SELECT COUNT(*) FROM reviews WHERE bank_id = {bank_id}")
+            self.assertEqual(rows[0][0], 3)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def fetch(conn, query):
+        with conn.cursor() as cur:
+            cur.execute(query)
+            return cur.fetchall()
+
+
+if __name__ == '__main__':
+    unittest.main()
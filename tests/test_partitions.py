@@ -0,0 +1,204 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+from datetime import date
+from unittest.mock import patch
+
+from db_fixtures import ScratchDatabaseTestCase
+import load_data
+import partitions
+import rollup
+import verify_data
+
+
+def review(day, bank_review="fine", sentiment="POSITIVE", score=0.9, rating=5):
+    return {'review': bank_review, 'rating': rating, 'date': day, 'sentiment': sentiment,
+            'sentiment_score': score, 'language': 'en', 'themes': ['Other']}
+
+
+class TestPartitions(ScratchDatabaseTestCase):
+    def setUp(self):
+        self.conn = load_data.get_db_connection()
+        with self.conn.cursor() as cur:
+            for _, name in partitions.list_partitions(cur):
+                cur.execute(f"DROP TABLE {name}")
+            cur.execute("TRUNCATE review_daily_rollup, review_daily_theme_rollup")
+        self.conn.commit()
+        self.bank_id = load_data.insert_bank_data(self.conn, "CBE")
+
+    def tearDown(self):
+        with self.conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS reviews_unpartitioned")
+        self.conn.commit()
+        self.conn.close()
+
+    def partition_names(self):
+        with self.conn.cursor() as cur:
+            return [name for _, name in partitions.list_partitions(cur)]
+
+    def test_month_helpers(self):
+        self.assertEqual(partitions.month_start("2025-12-31"), date(2025, 12, 1))
+        self.assertEqual(partitions.next_month(date(2025, 12, 1)), date(2026, 1, 1))
+        self.assertEqual(partitions.partition_name(date(2025, 3, 1)), "reviews_y2025m03")
+
+    def test_loader_creates_monthly_partitions(self):
+        load_data.insert_reviews_batch(self.conn, self.bank_id, [
+            review("2025-09-30"), review("2025-10-01"), review("2025-10-31"), review(None),
+        ])
+        self.assertEqual(self.partition_names(), ["reviews_y2025m09", "reviews_y2025m10"])
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT tableoid::regclass::text, COUNT(*) FROM reviews GROUP BY 1 ORDER BY 1")
+            self.assertEqual(cur.fetchall(), [("reviews_y2025m09", 1), ("reviews_y2025m10", 2)])
+
+        # A second batch into existing months adds no partitions
+        load_data.insert_reviews_batch(self.conn, self.bank_id, [review(date(2025, 10, 15))])
+        self.assertEqual(len(self.partition_names()), 2)
+
+    def test_failed_partition_ddl_leaves_connection_usable(self):
+        def broken(cur, month):
+            cur.execute("SELECT 1 / 0")
+
+        with patch.object(partitions, "_create_partition", side_effect=broken):
+            with self.assertRaises(Exception):
+                load_data.insert_reviews_batch(self.conn, self.bank_id, [review("2025-09-10")])
+        # The next batch on the same connection is not stuck in an aborted transaction
+        self.assertEqual(len(load_data.insert_reviews_batch(self.conn, self.bank_id, [review("2025-09-10")])), 1)
+
+    def test_date_range_query_scans_one_partition(self):
+        load_data.insert_reviews_batch(self.conn, self.bank_id, [
+            review("2025-08-10"), review("2025-09-10"), review("2025-10-10"),
+        ])
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                EXPLAIN SELECT COUNT(*) FROM reviews
+                WHERE bank_id = %s AND review_date >= '2025-09-01' AND review_date < '2025-10-01'
+            """, (self.bank_id,))
+            plan = "\n".join(row[0] for row in cur.fetchall())
+        self.assertIn("reviews_y2025m09", plan)
+        self.assertNotIn("reviews_y2025m08", plan)
+        self.assertNotIn("reviews_y2025m10", plan)
+
+    def test_rollup_update_only_reads_the_batch_months(self):
+        load_data.insert_reviews_batch(self.conn, self.bank_id, [
+            review("2025-08-10"), review("2025-09-10"), review("2025-10-10"),
+        ])
+        ids = load_data.insert_reviews_batch(self.conn, self.bank_id, [review("2025-09-11")])
+        where, params = rollup.batch_filter(ids, [date(2025, 9, 11)])
+        with self.conn.cursor() as cur:
+            cur.execute("EXPLAIN " + rollup.DAILY_ROLLUP_SQL.format(where=where), params)
+            plan = "\n".join(row[0] for row in cur.fetchall())
+        self.conn.rollback()
+        self.assertIn("reviews_y2025m09", plan)
+        self.assertNotIn("reviews_y2025m08", plan)
+        self.assertNotIn("reviews_y2025m10", plan)
+
+    def test_verify_data_queries_still_run(self):
+        load_data.insert_reviews_batch(self.conn, self.bank_id, [
+            review("2025-09-10"), review("2025-10-10", "slow", "NEGATIVE", 0.8, 1),
+        ])
+        out = io.StringIO()
+        with redirect_stdout(out):
+            verify_data.verify_data()
+        self.assertNotIn("Error", out.getvalue())
+        self.assertIn("Sentiment Distribution", out.getvalue())
+        self.assertIn("NEGATIVE", out.getvalue())
+
+    def test_detach_and_drop_before_cutoff(self):
+        load_data.insert_reviews_batch(self.conn, self.bank_id, [
+            review("2025-07-10"), review("2025-08-10"), review("2025-09-10"),
+        ])
+        # The cutoff month itself is kept, as is any month it falls inside
+        self.assertEqual(partitions.detach_partitions(self.conn, "2025-08-15"), ["reviews_y2025m07"])
+        self.assertEqual(self.partition_names(), ["reviews_y2025m08", "reviews_y2025m09"])
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM reviews_y2025m07")
+            self.assertEqual(cur.fetchone()[0], 1)
+            cur.execute("DROP TABLE reviews_y2025m07")
+        self.conn.commit()
+
+        self.assertEqual(partitions.drop_partitions(self.conn, "2025-09-01"), ["reviews_y2025m08"])
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM reviews")
+            self.assertEqual(cur.fetchone()[0], 1)
+            # Dropped months stay in the daily rollup
+            cur.execute("SELECT SUM(review_count) FROM review_daily_rollup")
+            self.assertEqual(cur.fetchone()[0], 3)
+
+    def test_rebuild_keeps_the_history_of_dropped_partitions(self):
+        load_data.insert_reviews_batch(self.conn, self.bank_id, [
+            review("2025-07-10"), review("2025-08-10"), review("2025-09-10"),
+        ])
+        partitions.drop_partitions(self.conn, "2025-08-01")
+        with self.conn.cursor() as cur:
+            cur.execute("UPDATE review_daily_rollup SET review_count = 99 WHERE day = '2025-09-10'")
+        self.conn.commit()
+
+        self.assertEqual(rollup.rebuild_daily_rollup(self.conn), date(2025, 8, 1))
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT day::text, review_count FROM review_daily_rollup ORDER BY day")
+            self.assertEqual(cur.fetchall(), [("2025-07-10", 1), ("2025-08-10", 1), ("2025-09-10", 1)])
+            cur.execute("SELECT COUNT(*) FROM review_daily_theme_rollup WHERE day = '2025-07-10'")
+            self.assertEqual(cur.fetchone()[0], 1)
+
+        # An explicit earlier start recomputes (and so loses) the dropped month
+        rollup.rebuild_daily_rollup(self.conn, since="2025-07-01")
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM review_daily_rollup WHERE day < '2025-08-01'")
+            self.assertEqual(cur.fetchone()[0], 0)
+
+    def test_bank_sub_partitions(self):
+        with patch.dict(os.environ, {"REVIEWS_BANK_PARTITIONS": "2"}):
+            other_bank = load_data.insert_bank_data(self.conn, "BOA")
+            load_data.insert_reviews_batch(self.conn, self.bank_id, [review("2025-11-03")])
+            load_data.insert_reviews_batch(self.conn, other_bank, [review("2025-11-04")])
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'reviews_y2025m11'::regclass ORDER BY 1
+            """)
+            self.assertEqual([r[0] for r in cur.fetchall()],
+                             ["reviews_y2025m11_b0", "reviews_y2025m11_b1"])
+            cur.execute("SELECT COUNT(*) FROM reviews WHERE review_date = '2025-11-03'")
+            self.assertEqual(cur.fetchone()[0], 1)
+
+    def test_migrate_unpartitioned_table(self):
+        with self.conn.cursor() as cur:
+            cur.execute("DROP TABLE reviews")
+            cur.execute("""
+                CREATE TABLE reviews (
+                    review_id SERIAL PRIMARY KEY,
+                    bank_id INTEGER REFERENCES banks(bank_id),
+                    review_text TEXT,
+                    rating INTEGER,
+                    review_date DATE,
+                    sentiment_label VARCHAR(20),
+                    sentiment_score FLOAT,
+                    source VARCHAR(100),
+                    language VARCHAR(10),
+                    themes TEXT[],
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("CREATE INDEX idx_reviews_bank_date ON reviews (bank_id, review_date)")
+            cur.execute("""
+                INSERT INTO reviews (bank_id, review_text, review_date)
+                VALUES (%(b)s, 'a', '2025-09-01'), (%(b)s, 'b', '2025-10-02'), (%(b)s, 'c', NULL),
+                       (NULL, 'd', '2025-10-03')
+            """, {"b": self.bank_id})
+        self.conn.commit()
+
+        self.assertEqual(partitions.migrate_unpartitioned(self.conn), 2)
+        self.assertIsNone(partitions.migrate_unpartitioned(self.conn))
+        self.assertEqual(self.partition_names(), ["reviews_y2025m09", "reviews_y2025m10"])
+
+        # New rows continue the old id sequence
+        ids = load_data.insert_reviews_batch(self.conn, self.bank_id, [review("2025-10-20")])
+        self.assertEqual(ids, [5])
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT review_text FROM reviews ORDER BY review_id")
+            self.assertEqual([r[0] for r in cur.fetchall()], ["a", "b", "fine"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+
+import pandas as pd
+
+from db_fixtures import ScratchDatabaseTestCase
+import load_data
+from scripts.review_search import ReviewIndex, parse_query, search_reviews_db, tokenize
+
+
+def make_reviews():
+    return pd.DataFrame({
+        "review": ["Transfer failed twice, OTP never arrived",
+                   "OTP is slow",
+                   "failed to open, transfer works",
+                   "ገንዘብ፡መላላክ አልሰራም",
+                   "great app"],
+        "rating": [1, 2, 3, 1, 5],
+        "date": pd.to_datetime(["2025-10-02", "2025-10-20", "2025-09-15", "2025-10-05", "2025-10-06"]),
+        "bank": ["CBE", "CBE", "CBE", "CBE", "BOA"],
+        "sentiment": ["NEGATIVE", "NEGATIVE", "POSITIVE", "NEGATIVE", "POSITIVE"],
+        "sentiment_score": [0.99, 0.9, 0.6, 0.8, 0.99],
+        "themes": [["Transaction Issues"], ["App Performance"], ["Transaction Issues"],
+                   ["Transaction Issues"], ["Other"]],
+    })
+
+
+class TestQueryParsing(unittest.TestCase):
+    def test_tokenize_splits_on_ethiopic_word_separator(self):
+        self.assertEqual(tokenize("ገንዘብ፡መላላክ። OTP"), ["ገንዘብ", "መላላክ", "otp"])
+
+    def test_parse_query_groups(self):
+        self.assertEqual(parse_query('OTP or "transfer failed" -slow'),
+                         [[(False, ["otp"])], [(False, ["transfer", "failed"]), (True, ["slow"])]])
+        self.assertEqual(parse_query('the "otp is slow"'), [[(False, ["otp", None, "slow"])]])
+
+
+class TestReviewIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ReviewIndex(make_reviews())
+
+    def test_phrase_requires_adjacent_words(self):
+        results = self.index.search('"transfer failed"')
+        self.assertEqual(results["review_id"].tolist(), [0])
+
+    def test_or_exclusion_and_filters(self):
+        results = self.index.search('OTP or "transfer failed"', bank="CBE",
+                                    start_date="2025-10-01", end_date="2025-10-31")
+        self.assertEqual(sorted(results["review_id"]), [0, 1])
+        self.assertEqual(self.index.search("OTP -slow")["review_id"].tolist(), [0])
+
+    def test_stop_words_match_like_the_database(self):
+        self.assertTrue(self.index.search("the").empty)
+        self.assertEqual(self.index.search('"failed to open"')["review_id"].tolist(), [2])
+        # A stop word inside a phrase still stands for one word
+        self.assertEqual(self.index.search('"otp was slow"')["review_id"].tolist(), [1])
+        self.assertTrue(self.index.search('"otp slow"').empty)
+
+    def test_amharic_tokens_are_searchable(self):
+        results = self.index.search("መላላክ", theme="Transaction Issues", sentiment="negative")
+        self.assertEqual(results["review_id"].tolist(), [3])
+
+    def test_pagination(self):
+        first = self.index.search("otp or transfer", limit=2)
+        second = self.index.search("otp or transfer", limit=2, offset=2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse(set(first["review_id"]) & set(second["review_id"]))
+
+
+class TestSearchReviewsDb(ScratchDatabaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.conn = load_data.get_db_connection()
+        df = make_reviews()
+        df["date"] = df["date"].dt.date
+        for bank in df["bank"].unique():
+            bank_id = load_data.insert_bank_data(cls.conn, bank)
+            load_data.insert_reviews_batch(cls.conn, bank_id, df[df["bank"] == bank].to_dict("records"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+        super().tearDownClass()
+
+    def search(self, query, **filters):
+        return search_reviews_db(self.conn, query, **filters)["review"].tolist()
+
+    def test_phrase_or_and_filters(self):
+        self.assertEqual(sorted(self.search('OTP or "transfer failed"', bank="CBE",
+                                            start_date="2025-10-01", end_date="2025-10-31")),
+                         ["OTP is slow", "Transfer failed twice, OTP never arrived"])
+        self.assertEqual(self.search("OTP -slow"), ["Transfer failed twice, OTP never arrived"])
+
+    def test_stop_words_match_like_the_file_index(self):
+        self.assertEqual(self.search("the"), [])
+        self.assertEqual(self.search('"failed to open"'), ["failed to open, transfer works"])
+        self.assertEqual(self.search('"otp was slow"'), ["OTP is slow"])
+        self.assertEqual(self.search('"otp slow"'), [])
+
+    def test_amharic_tokens_are_searchable(self):
+        self.assertEqual(self.search("መላላክ", theme="Transaction Issues", sentiment="negative"),
+                         ["ገንዘብ፡መላላክ አልሰራም"])
+
+    def test_pagination(self):
+        first = self.search("otp or transfer", limit=2)
+        second = self.search("otp or transfer", limit=2, offset=2)
+        self.assertEqual(len(first) + len(second), 3)
+        self.assertFalse(set(first) & set(second))
+
+    def test_search_uses_gin_index(self):
+        with self.conn.cursor() as cur:
+            cur.execute("SET enable_seqscan = off")
+            cur.execute("EXPLAIN SELECT 1 FROM reviews WHERE search_tsv @@ websearch_to_tsquery('english', 'otp')")
+            plan = "\n".join(row[0] for row in cur.fetchall())
+            cur.execute("RESET enable_seqscan")
+        # reviews is partitioned; each partition carries its own copy of idx_reviews_search
+        self.assertIn("Bitmap Index Scan", plan)
+        self.assertIn("search_tsv_idx", plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
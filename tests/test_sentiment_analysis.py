@@ -1,11 +1,19 @@
+import io
 import os
 import sys
+import tempfile
 import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import date
+from pathlib import Path
 from unittest.mock import patch, MagicMock
 
+import pandas as pd
+
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from scripts import sentiment_analysis
 from scripts.sentiment_analysis import detect_language, analyze_sentiment, extract_themes, _ensure_models_loaded
 
 class TestSentimentAnalysis(unittest.TestCase):
@@ -57,5 +65,171 @@ class TestSentimentAnalysis(unittest.TestCase):
             self.assertEqual(sentiment, "POSITIVE")
             self.assertGreater(score, 0.9)
 
+
+def fake_analyze_chunk(chunk):
+    chunk = chunk.copy()
+    chunk['language'] = 'en'
+    chunk['sentiment'] = 'POSITIVE'
+    chunk['sentiment_score'] = 0.5
+    chunk['themes'] = [['Other']] * len(chunk)
+    return chunk
+
+
+class TestCheckpointedRuns(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.runs_patch = patch.object(sentiment_analysis, 'RUNS_DIR', Path(self.tmp.name))
+        self.runs_patch.start()
+        self.df = pd.DataFrame({'review': [f"review {i}" for i in range(5)], 'bank': 'CBE'})
+        self.input_path = Path(self.tmp.name) / "clean.csv"
+        self.df.to_csv(self.input_path, index=False)
+
+    def tearDown(self):
+        self.runs_patch.stop()
+        self.tmp.cleanup()
+
+    def test_resume_continues_after_last_completed_chunk(self):
+        run_dir, manifest = sentiment_analysis.start_run(self.input_path, len(self.df), chunk_size=2, run_id="r1")
+        self.assertEqual(manifest['num_chunks'], 3)
+
+        calls = []
+
+        def crash_on_second(chunk):
+            calls.append(chunk.index[0])
+            if len(calls) == 2:
+                raise MemoryError("killed")
+            return fake_analyze_chunk(chunk)
+
+        with patch.object(sentiment_analysis, 'analyze_chunk', side_effect=crash_on_second):
+            with self.assertRaises(MemoryError):
+                sentiment_analysis.process_chunks(self.df, run_dir, manifest)
+
+        run_dir, manifest = sentiment_analysis.resume_run("r1", self.input_path, len(self.df))
+        self.assertEqual(manifest['completed_chunks'], [0])
+        self.assertFalse(list(run_dir.glob("*.tmp")))
+
+        with patch.object(sentiment_analysis, 'analyze_chunk', side_effect=fake_analyze_chunk) as analyze:
+            sentiment_analysis.process_chunks(self.df, run_dir, manifest)
+        self.assertEqual([c.args[0].index[0] for c in analyze.call_args_list], [2, 4])
+
+        result = sentiment_analysis.compact_run(run_dir, sentiment_analysis.load_manifest(run_dir))
+        self.assertEqual(result['review'].tolist(), self.df['review'].tolist())
+        self.assertEqual(result['themes'].iloc[0], ['Other'])
+
+    def test_monitor_is_fed_checkpointed_chunks_once(self):
+        from scripts import sentiment_monitor
+        today = date.today().isoformat()
+        self.df['date'] = today
+        run_dir, manifest = sentiment_analysis.start_run(self.input_path, len(self.df), chunk_size=2, run_id="r4")
+        with patch.object(sentiment_analysis, 'analyze_chunk', side_effect=fake_analyze_chunk):
+            sentiment_analysis.process_chunks(self.df, run_dir, manifest)
+
+        monitor_dir = Path(self.tmp.name) / "monitor"
+        with patch.object(sentiment_monitor, 'STATE_PATH', monitor_dir / "state.json"), \
+                patch.object(sentiment_monitor, 'ALERTS_PATH', monitor_dir / "alerts.jsonl"):
+            sentiment_analysis.open_monitor(run_dir, manifest)
+            self.assertEqual(manifest['monitored_chunks'], [0, 1, 2])
+            # Reopening (as on --resume) feeds nothing twice, even when the
+            # manifest missed chunks the monitor state already recorded
+            sentiment_analysis.open_monitor(run_dir, manifest)
+            manifest['monitored_chunks'] = [0]
+            sentiment_analysis.open_monitor(run_dir, manifest)
+            self.assertEqual(manifest['monitored_chunks'], [0, 1, 2])
+            monitor = sentiment_monitor.SentimentMonitor()
+        self.assertEqual(monitor.banks['CBE']['days'][today].n, 5)
+
+    def test_resume_rejects_different_input(self):
+        sentiment_analysis.start_run(self.input_path, len(self.df), chunk_size=2, run_id="r2")
+        with self.assertRaises(ValueError):
+            sentiment_analysis.resume_run("r2", self.input_path, len(self.df) + 1)
+
+    def test_resume_rejects_same_sized_different_input(self):
+        sentiment_analysis.start_run(self.input_path, len(self.df), chunk_size=2, run_id="r5")
+        other = Path(self.tmp.name) / "other.csv"
+        self.df.assign(review=self.df['review'].str.upper()).to_csv(other, index=False)
+        with self.assertRaises(ValueError):
+            sentiment_analysis.resume_run("r5", other, len(self.df))
+        # The same contents under another name are fine
+        copy = Path(self.tmp.name) / "copy.csv"
+        copy.write_bytes(self.input_path.read_bytes())
+        sentiment_analysis.resume_run("r5", copy, len(self.df))
+
+    def test_compaction_requires_all_chunks(self):
+        run_dir, manifest = sentiment_analysis.start_run(self.input_path, len(self.df), chunk_size=2, run_id="r3")
+        with self.assertRaises(RuntimeError):
+            sentiment_analysis.compact_run(run_dir, manifest)
+
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.runs_patch = patch.object(sentiment_analysis, 'RUNS_DIR', Path(self.tmp.name))
+        self.runs_patch.start()
+        self.df = pd.DataFrame({
+            'review': [f"review {i}" for i in range(20)] + ["review 0"],
+            'date': '2025-11-27',
+            'bank': 'CBE',
+        })
+        self.input_path = Path(self.tmp.name) / "clean.csv"
+        self.df.to_csv(self.input_path, index=False)
+
+    def tearDown(self):
+        self.runs_patch.stop()
+        self.tmp.cleanup()
+
+    def run_shard(self, shard):
+        shard_df = sentiment_analysis.select_shard(self.df, shard)
+        run_dir, manifest = sentiment_analysis.start_run(self.input_path, len(shard_df), chunk_size=3, shard=shard)
+        with patch.object(sentiment_analysis, 'analyze_chunk', side_effect=fake_analyze_chunk):
+            sentiment_analysis.process_chunks(shard_df, run_dir, manifest)
+        return run_dir
+
+    def test_shards_partition_the_input(self):
+        sizes = [len(sentiment_analysis.select_shard(self.df, (i, 3))) for i in range(3)]
+        self.assertEqual(sum(sizes), len(self.df))
+        keys = sentiment_analysis.review_keys(self.df)
+        self.assertEqual(keys.tolist(), sentiment_analysis.review_keys(self.df.copy()).tolist())
+
+    def test_merge_restores_input_order(self):
+        run_dirs = [self.run_shard((i, 3)) for i in range(3)]
+        merged, report = sentiment_analysis.merge_shards(run_dirs, self.df)
+        self.assertEqual(report['status'], 'complete')
+        self.assertEqual(merged['review'].tolist(), self.df['review'].tolist())
+        self.assertNotIn('review_key', merged.columns)
+
+    def test_merge_reports_missing_and_repeated_shards(self):
+        first = self.run_shard((0, 3))
+        second = self.run_shard((1, 3))
+        merged, report = sentiment_analysis.merge_shards([first, second, second], self.df)
+        self.assertIsNone(merged)
+        self.assertEqual(report['status'], 'failed')
+        self.assertGreater(report['missing_keys'], 0)
+        self.assertGreater(report['duplicate_keys'], 0)
+        self.assertTrue(any('Missing shards: [2]' in e for e in report['errors']))
+
+    def test_merge_reports_unknown_run_id(self):
+        run_dirs = [self.run_shard((i, 2)) for i in range(2)]
+        merged, report = sentiment_analysis.merge_shards([run_dirs[0], "no-such-run"], self.df)
+        self.assertIsNone(merged)
+        self.assertTrue(any("no-such-run" in error for error in report['errors']))
+        self.assertIn("Missing shards: [1]", report['errors'])
+
+    def test_failed_merge_exits_non_zero(self):
+        first = self.run_shard((0, 2))
+        with redirect_stdout(io.StringIO()), self.assertRaises(SystemExit) as cm:
+            sentiment_analysis.main(["--merge", first.name, "--input", str(self.input_path)])
+        self.assertEqual(cm.exception.code, 1)
+
+    def test_monitor_is_rejected_for_shards(self):
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            sentiment_analysis.parse_args(["--shard", "0/2", "--monitor"])
+
+    def test_parse_shard_validates_range(self):
+        self.assertEqual(sentiment_analysis.parse_shard("1/4"), (1, 4))
+        for bad in ["4/4", "-1/2", "1", "a/b"]:
+            with self.assertRaises(Exception):
+                sentiment_analysis.parse_shard(bad)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
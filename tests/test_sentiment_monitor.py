@@ -0,0 +1,222 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.sentiment_monitor import RunningStats, Ewma, SentimentMonitor, poll_db
+from db_fixtures import ScratchDatabaseTestCase
+import load_data
+
+
+def day_reviews(bank, day, negatives, themes=('App Performance',), total=10):
+    """total reviews on a day, the first `negatives` of them NEGATIVE with the given themes."""
+    return [
+        {'bank': bank, 'date': day, 'review': f'{bank} review {i} of {day}',
+         'sentiment': 'NEGATIVE' if i < negatives else 'POSITIVE',
+         'sentiment_score': 0.9, 'themes': list(themes) if i < negatives else "['Other']"}
+        for i in range(total)
+    ]
+
+
+def quiet_days(bank, start, days):
+    """Baseline days: 2 of 10 reviews negative, about app performance."""
+    records = []
+    for offset in range(days):
+        records += day_reviews(bank, (start + timedelta(days=offset)).isoformat(), negatives=2)
+    return records
+
+
+class TestOnlineStats(unittest.TestCase):
+    def test_welford_matches_numpy(self):
+        values = [0.9, -0.8, 0.0, 0.95, -0.99, 0.5]
+        stats = RunningStats()
+        for v in values:
+            stats.add(v)
+        self.assertAlmostEqual(stats.mean, np.mean(values))
+        self.assertAlmostEqual(stats.variance, np.var(values, ddof=1))
+
+    def test_ewma_tracks_level(self):
+        ewma = Ewma()
+        for _ in range(50):
+            ewma.update(0.2, alpha=0.2)
+        self.assertAlmostEqual(ewma.mean, 0.2)
+        self.assertAlmostEqual(ewma.var, 0.0)
+        self.assertGreater(ewma.zscore(0.5, min_std=0.05), 3)
+
+
+class TestSentimentMonitor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_path = Path(self.tmp.name) / "state.json"
+        self.alerts_path = Path(self.tmp.name) / "alerts.jsonl"
+        self.start = date(2025, 10, 1)
+        self.spike_date = date(2025, 10, 15)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def monitor(self):
+        return SentimentMonitor(self.state_path, self.alerts_path)
+
+    def history(self, *banks, days=14):
+        return pd.DataFrame([r for bank in banks for r in quiet_days(bank, self.start, days)])
+
+    def spike_day(self):
+        return day_reviews('CBE', self.spike_date.isoformat(), negatives=7, themes=('Transaction Issues',))
+
+    def test_transaction_issue_surge_is_flagged_once(self):
+        monitor = self.monitor()
+        self.assertEqual(monitor.backfill(self.history('CBE')), [])
+
+        alerts = monitor.update(self.spike_day(), today=self.spike_date)
+        kinds = {(a['type'], a['theme']) for a in alerts}
+        self.assertIn(('negative_ratio', None), kinds)
+        self.assertIn(('negative_theme', 'Transaction Issues'), kinds)
+        self.assertIn(('sentiment_drop', None), kinds)
+        surge = next(a for a in alerts if a['theme'] == 'Transaction Issues')
+        self.assertEqual((surge['bank'], surge['day'], surge['value']), ('CBE', '2025-10-15', 1.0))
+
+        # More reviews for the same day do not repeat the alerts
+        self.assertEqual(monitor.update(self.spike_day(), today=self.spike_date), [])
+        with open(self.alerts_path, encoding="utf-8") as f:
+            self.assertEqual(len([json.loads(line) for line in f]), len(alerts))
+
+    def test_other_banks_are_independent(self):
+        monitor = self.monitor()
+        monitor.backfill(self.history('CBE', 'BOA'))
+        alerts = monitor.update(self.spike_day() + day_reviews('BOA', '2025-10-15', negatives=2),
+                                today=self.spike_date)
+        self.assertEqual({a['bank'] for a in alerts}, {'CBE'})
+
+    def test_newest_first_feed_keeps_every_review(self):
+        # The scraper and loader deliver reviews newest first
+        monitor = self.monitor()
+        today = date(2025, 10, 20)
+        recent = [r for offset in range(monitor.lateness_days)
+                  for r in day_reviews('CBE', (today - timedelta(days=offset)).isoformat(), negatives=2)]
+        for start in range(0, len(recent), 7):
+            monitor.update(recent[start:start + 7], today=today)
+        self.assertEqual(monitor.late_reviews, 0)
+        self.assertEqual(sum(d.n for d in monitor.banks['CBE']['days'].values()), 30)
+
+        # The days close (into the baseline) as the clock moves on, not as newer reviews arrive
+        monitor.update([], today=today + timedelta(days=2))
+        self.assertEqual(monitor.banks['CBE']['baseline'].days, 2)
+
+    def test_restart_resumes_from_saved_state(self):
+        uninterrupted = self.monitor()
+        uninterrupted.backfill(self.history('CBE'))
+        expected = uninterrupted.update(self.spike_day(), today=self.spike_date)
+        os.remove(self.alerts_path)
+
+        first = self.monitor()
+        first.backfill(self.history('CBE'))
+        first.save()
+        restarted = self.monitor()
+        self.assertEqual(restarted.banks['CBE']['baseline'].days, 11)
+        alerts = restarted.update(self.spike_day(), today=self.spike_date)
+        def strip(rows):
+            return [{k: v for k, v in a.items() if k != 'detected_at'} for a in rows]
+
+        self.assertEqual(strip(alerts), strip(expected))
+
+    def test_run_chunks_do_not_depend_on_order_or_size(self):
+        # An analysis run feeds newest-first chunks without advancing, then closes the days once
+        records = list(reversed(quiet_days('CBE', self.start, 14) + quiet_days('BOA', self.start, 14)))
+        end = self.start + timedelta(days=14)
+        states = []
+        for size in (100, 7):
+            os.makedirs(Path(self.tmp.name) / str(size))
+            monitor = SentimentMonitor(Path(self.tmp.name) / str(size) / "state.json", self.alerts_path)
+            for start in range(0, len(records), size):
+                monitor.update(records[start:start + size], today=end, batch_id=f"run/{start}", advance=False)
+            monitor.update([], today=end)
+            self.assertEqual(monitor.late_reviews, 0)
+            self.assertEqual(monitor.banks['BOA']['baseline'].days, 14 - monitor.lateness_days + 1)
+            states.append({bank: b['baseline'].to_dict() for bank, b in monitor.banks.items()})
+        self.assertEqual(states[0], states[1])
+
+    def test_reviews_fed_again_on_open_days_count_once(self):
+        # The scraper fetches the newest reviews, so the next run repeats the open days
+        monitor = self.monitor()
+        today = date(2025, 10, 20)
+        scrape = day_reviews('CBE', today.isoformat(), negatives=2)
+        monitor.update(scrape, today=today, batch_id="run-a/0")
+        monitor.save()
+        restarted = self.monitor()
+        restarted.update(scrape + day_reviews('CBE', today.isoformat(), negatives=0, total=12)[10:],
+                         today=today, batch_id="run-b/0")
+        self.assertEqual(restarted.banks['CBE']['days'][today.isoformat()].n, 12)
+        self.assertEqual(restarted.duplicate_reviews, 10)
+
+    def test_batches_are_applied_once(self):
+        monitor = self.monitor()
+        today = date(2025, 10, 20)
+        monitor.update(day_reviews('CBE', today.isoformat(), negatives=2), today=today, batch_id="run/0")
+        monitor.save()
+        restarted = self.monitor()
+        restarted.update(day_reviews('CBE', today.isoformat(), negatives=2), today=today, batch_id="run/0")
+        self.assertEqual(restarted.banks['CBE']['days'][today.isoformat()].n, 10)
+
+    def test_memory_is_bounded_by_the_lateness_window(self):
+        monitor = self.monitor()
+        monitor.backfill(self.history('CBE', days=60))
+        self.assertEqual(len(monitor.banks['CBE']['days']), monitor.lateness_days)
+
+    def test_reviews_for_closed_days_are_counted_as_late(self):
+        monitor = self.monitor()
+        monitor.backfill(self.history('CBE', days=10))
+        out = io.StringIO()
+        with redirect_stdout(out):
+            monitor.update(day_reviews('CBE', self.start.isoformat(), negatives=10),
+                           today=self.start + timedelta(days=9))
+        self.assertEqual(monitor.late_reviews, 10)
+        self.assertIn("Skipped 10 review(s)", out.getvalue())
+
+    def test_no_alerts_before_warmup(self):
+        monitor = self.monitor()
+        monitor.backfill(self.history('CBE', days=3))
+        self.assertEqual(monitor.update(day_reviews('CBE', '2025-10-04', negatives=9),
+                                        today=date(2025, 10, 4)), [])
+
+
+class TestPollDb(ScratchDatabaseTestCase):
+    def test_polls_only_new_reviews(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        monitor = SentimentMonitor(Path(tmp.name) / "state.json", Path(tmp.name) / "alerts.jsonl")
+        conn = load_data.get_db_connection()
+        self.addCleanup(conn.close)
+        bank_id = load_data.insert_bank_data(conn, "Dashen")
+        today = date.today()
+        yesterday = today - timedelta(days=1)
+
+        load_data.insert_reviews_batch(conn, bank_id, day_reviews('Dashen', today.isoformat(), negatives=3))
+        self.assertEqual(poll_db(conn, monitor, batch_size=4), 10)
+        # Newest first, as load_data.main inserts the scraped CSV
+        load_data.insert_reviews_batch(conn, bank_id, day_reviews('Dashen', yesterday.isoformat(),
+                                                                  negatives=1, total=5))
+        self.assertEqual(poll_db(conn, monitor), 5)
+        self.assertEqual(poll_db(conn, monitor), 0)
+
+        restarted = SentimentMonitor(Path(tmp.name) / "state.json", Path(tmp.name) / "alerts.jsonl")
+        days = restarted.banks['Dashen']['days']
+        self.assertEqual((days[today.isoformat()].n, days[today.isoformat()].negatives), (10, 3))
+        self.assertEqual(days[today.isoformat()].negative_themes, {'App Performance': 3})
+        self.assertEqual(days[yesterday.isoformat()].n, 5)
+        self.assertEqual(restarted.late_reviews, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.theme_discovery import discover_themes, make_vectorizer, resolve_terms
+
+
+class TestThemeDiscovery(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        topics = [
+            ("otp code never received sms", "CBE", "NEGATIVE", "['Other']"),
+            ("login password reset locked", "BOA", "NEGATIVE", "['Other']"),
+            ("ገንዘብ መላላክ ቀላል", "CBE", "POSITIVE", "['Transaction Issues']"),
+        ]
+        rows = [
+            {"review": f"{text} {i}", "bank": bank, "sentiment": sentiment, "themes": themes}
+            for i in range(30) for text, bank, sentiment, themes in topics
+        ]
+        cls.tmp = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8")
+        pd.DataFrame(rows).to_csv(cls.tmp.name, index=False)
+        cls.tmp.close()
+        # Small chunks so every pass really streams
+        cls.themes, cls.by_bank = discover_themes(cls.tmp.name, n_clusters=3, n_terms=3, chunk_size=7)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.tmp.name)
+
+    def test_clusters_recover_topics(self):
+        self.assertEqual(sorted(self.themes["count"]), [30, 30, 30])
+        terms = " | ".join(self.themes["top_terms"])
+        for word in ["otp", "password", "መላላክ"]:
+            self.assertIn(word, terms)
+
+    def test_breakdown_by_bank_and_sentiment(self):
+        self.assertEqual(self.by_bank["count"].sum(), 90)
+        cbe_negative = self.by_bank[(self.by_bank["bank"] == "CBE") & (self.by_bank["sentiment"] == "NEGATIVE")]
+        self.assertEqual(cbe_negative["share"].tolist(), [1.0])
+        self.assertIn("otp", cbe_negative["top_terms"].iloc[0])
+
+    def test_other_share_flags_unlabelled_clusters(self):
+        amharic = self.themes[self.themes["top_terms"].str.contains("መላላክ")]
+        self.assertEqual(amharic["other_share"].tolist(), [0.0])
+
+    def test_resolve_terms_inverts_hashing(self):
+        vectorizer = make_vectorizer()
+        index = vectorizer.transform(["otp"]).indices[0]
+        self.assertEqual(resolve_terms(self.tmp.name, vectorizer, {index}, chunk_size=7), {index: "otp"})
+
+    def test_colliding_terms_resolve_to_the_most_frequent(self):
+        vectorizer = make_vectorizer(n_features=2 ** 4)
+        bucket = vectorizer.transform(["zebra"]).indices[0]
+        # An alphabetically earlier, rarer term in the same bucket
+        rare = next(word for word in (f"word{i}" for i in range(100))
+                    if vectorizer.transform([word]).indices[0] == bucket)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "collide.csv")
+            pd.DataFrame({"review": [rare] + ["zebra"] * 5}).to_csv(path, index=False)
+            self.assertEqual(resolve_terms(path, vectorizer, {bucket}, chunk_size=2, capacity=1),
+                             {bucket: "zebra"})
+
+
+if __name__ == '__main__':
+    unittest.main()